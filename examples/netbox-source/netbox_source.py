@@ -23,97 +23,365 @@ Usage:
   HTTP server:  python3 netbox_source.py --serve --port 8080
   One-shot:     python3 netbox_source.py
 
+In server mode the transformed device list is kept in memory and refreshed
+incrementally: each request only asks NetBox for devices whose last_updated
+is newer than the previous sync. A full sync runs every FULL_SYNC_INTERVAL
+seconds to drop devices that were deleted or no longer match the filters;
+NetBox webhooks POSTed to /webhook apply deletions immediately.
+
 Environment variables:
   NETBOX_URL      - NetBox base URL (required)
   NETBOX_TOKEN    - NetBox API token (required)
   DOMAIN_SUFFIX   - FQDN suffix for devices without a primary IP (default: "")
-  DEVICE_FILTERS  - NetBox API query string filters (default: "status=active&limit=0")
+  DEVICE_FILTERS  - NetBox API query string filters (default: "status=active")
+  DEVICE_FIELDS   - Device fields requested from NetBox (default: "name,primary_ip4,device_type")
+  PAGE_SIZE       - Devices requested per API page (default: 1000)
+  FETCH_WORKERS   - Pages fetched in parallel (default: 8)
   LISTEN_PORT     - HTTP server port when using --serve (default: 8080)
+  FULL_SYNC_INTERVAL - Seconds between full syncs in server mode (default: 3600, 0 = always full)
+  STATE_FILE      - Persist the device map here for fast restarts (default: "", disabled)
+  WEBHOOK_SECRET  - Secret for verifying NetBox webhook signatures (default: "", unverified)
 """
 
 import argparse
+import hashlib
+import hmac
+import http.client
 import json
 import os
 import ssl
-import sys
+import threading
+import time
 import urllib.error
-import urllib.request
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
 # ── Configuration (from environment) ─────────────────────────────────────────
 
 NETBOX_URL = os.environ.get("NETBOX_URL", "").rstrip("/")
 NETBOX_TOKEN = os.environ.get("NETBOX_TOKEN", "")
 DOMAIN_SUFFIX = os.environ.get("DOMAIN_SUFFIX", "")
-DEVICE_FILTERS = os.environ.get("DEVICE_FILTERS", "status=active&limit=0")
+DEVICE_FILTERS = os.environ.get("DEVICE_FILTERS", "status=active")
+DEVICE_FIELDS = os.environ.get("DEVICE_FIELDS", "name,primary_ip4,device_type")
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "1000"))
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "8"))
+REQUEST_TIMEOUT = int(os.environ.get("REQUEST_TIMEOUT", "60"))
 LISTEN_PORT = int(os.environ.get("LISTEN_PORT", "8080"))
+FULL_SYNC_INTERVAL = int(os.environ.get("FULL_SYNC_INTERVAL", "3600"))
+STATE_FILE = os.environ.get("STATE_FILE", "")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+
+# Paging parameters are managed by the fetcher; any set in DEVICE_FILTERS
+# (e.g. the old "limit=0") are dropped.
+PAGING_PARAMS = {"limit", "offset", "fields", "brief"}
+
+# Always requested alongside DEVICE_FIELDS so the device map can be kept in sync
+SYNC_FIELDS = ["id", "last_updated"]
 
 # ── NetBox API ───────────────────────────────────────────────────────────────
 
+# One keep-alive connection per worker thread, reused across pages and refreshes
+_local = threading.local()
+_executor = None
 
-def fetch_devices():
-    """Fetch devices from NetBox API."""
-    if not NETBOX_URL or not NETBOX_TOKEN:
-        return {"error": "NETBOX_URL and NETBOX_TOKEN environment variables are required"}
 
-    url = f"{NETBOX_URL}/api/dcim/devices/?{DEVICE_FILTERS}"
+def _open_connection():
+    """Open a keep-alive connection to the NetBox host."""
+    parsed = urllib.parse.urlsplit(NETBOX_URL)
+    if parsed.scheme == "https":
+        # Allow self-signed certificates
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection(parsed.netloc, timeout=REQUEST_TIMEOUT, context=ctx)
+    return http.client.HTTPConnection(parsed.netloc, timeout=REQUEST_TIMEOUT)
+
+
+def _api_get(path, params):
+    """GET a NetBox API path over this thread's pooled connection and parse the JSON body."""
+    base_path = urllib.parse.urlsplit(NETBOX_URL).path
+    url = f"{base_path}{path}?{urllib.parse.urlencode(params)}"
     headers = {
         "Authorization": f"Token {NETBOX_TOKEN}",
-        "Content-Type": "application/json",
         "Accept": "application/json",
     }
 
-    # Allow self-signed certificates
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
+    # A pooled connection may have been closed by the server; retry once on a fresh one
+    for attempt in range(2):
+        conn = getattr(_local, "conn", None)
+        if conn is None:
+            conn = _local.conn = _open_connection()
+        try:
+            conn.request("GET", url, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            break
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            _local.conn = None
+            if attempt:
+                raise
+
+    if response.status != 200:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+    return json.loads(body)
+
+
+def _device_params(extra_filters=()):
+    """Build the device list query: user filters plus field selection and page size."""
+    params = [
+        (k, v) for k, v in urllib.parse.parse_qsl(DEVICE_FILTERS, keep_blank_values=True) if k not in PAGING_PARAMS
+    ]
+    params.extend(extra_filters)
+    if DEVICE_FIELDS:
+        fields = [f for f in DEVICE_FIELDS.split(",") if f]
+        fields += [f for f in SYNC_FIELDS if f not in fields]
+        params.append(("fields", ",".join(fields)))
+    params.append(("limit", PAGE_SIZE))
+    return params
+
+
+def _fetch_page(params, offset):
+    """Fetch and parse one page of devices."""
+    return _api_get("/api/dcim/devices/", params + [("offset", offset)]).get("results", [])
+
+
+def fetch_devices(extra_filters=(), transform=None):
+    """Fetch devices from NetBox API.
+
+    The first page reports the total count; the remaining pages are fetched in
+    parallel over pooled connections. Each page is transformed as soon as it
+    arrives and only the transformed entries are kept, so raw API pages never
+    pile up in memory. Only the fields needed by transform_device() are requested.
+
+    Args:
+        extra_filters: Additional (key, value) query filters, e.g. a last_updated bound.
+        transform: Called with each raw device; None results are dropped.
+            Defaults to transform_device().
+
+    Returns:
+        List of transformed devices in NetBox order, or an error dict.
+    """
+    global _executor
 
-    req = urllib.request.Request(url, headers=headers)
+    if not NETBOX_URL or not NETBOX_TOKEN:
+        return {"error": "NETBOX_URL and NETBOX_TOKEN environment variables are required"}
+
+    transform = transform or transform_device
+    params = _device_params(extra_filters)
+
+    def transform_page(page):
+        return [entry for entry in map(transform, page) if entry is not None]
 
     try:
-        with urllib.request.urlopen(req, context=ctx) as response:
-            data = json.loads(response.read().decode())
-            return data.get("results", [])
-    except urllib.error.URLError as e:
+        first = _api_get("/api/dcim/devices/", params + [("offset", 0)])
+        first_page = first.get("results", [])
+        # NetBox caps the page size at MAX_PAGE_SIZE; step by what was actually returned
+        count = first.get("count", 0)
+        step = len(first_page) or PAGE_SIZE
+        pages = {0: transform_page(first_page)}
+        del first, first_page
+
+        if count > step:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="netbox-fetch")
+            futures = {_executor.submit(_fetch_page, params, offset): offset for offset in range(step, count, step)}
+            for future in as_completed(futures):
+                pages[futures.pop(future)] = transform_page(future.result())
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as e:
         return {"error": str(e)}
 
+    return [entry for offset in sorted(pages) for entry in pages.pop(offset)]
 
-# ── Transform ────────────────────────────────────────────────────────────────
 
+# ── Transform ────────────────────────────────────────────────────────────────
 
-def transform_devices(devices):
-    """Transform NetBox devices to Oxidized HTTP source format."""
-    if isinstance(devices, dict) and "error" in devices:
-        return devices
 
-    oxidized_devices = []
+def transform_device(device):
+    """Transform one NetBox device to an Oxidized HTTP source entry, or None if unnamed."""
+    name = device.get("name", "")
+    if not name:
+        return None
 
-    for device in devices:
-        name = device.get("name", "")
-        if not name:
-            continue
+    # Primary IPv4 (strip CIDR)
+    primary_ip = None
+    if device.get("primary_ip4") and device["primary_ip4"].get("address"):
+        primary_ip = device["primary_ip4"]["address"].split("/")[0]
 
-        # Primary IPv4 (strip CIDR)
-        primary_ip = None
-        if device.get("primary_ip4") and device["primary_ip4"].get("address"):
-            primary_ip = device["primary_ip4"]["address"].split("/")[0]
+    # Manufacturer slug → Oxidized model
+    manufacturer = "unknown"
+    if device.get("device_type") and device["device_type"].get("manufacturer"):
+        manufacturer = device["device_type"]["manufacturer"].get("slug", "unknown")
 
-        # Manufacturer slug → Oxidized model
-        manufacturer = "unknown"
-        if device.get("device_type") and device["device_type"].get("manufacturer"):
-            manufacturer = device["device_type"]["manufacturer"].get("slug", "unknown")
+    # Fall back to FQDN if no IP
+    ip = primary_ip or (f"{name}{DOMAIN_SUFFIX}" if DOMAIN_SUFFIX else name)
 
-        # Fall back to FQDN if no IP
-        ip = primary_ip or (f"{name}{DOMAIN_SUFFIX}" if DOMAIN_SUFFIX else name)
+    return {
+        "name": name,
+        "model": manufacturer,
+        "ip": ip,
+    }
 
-        oxidized_devices.append(
-            {
-                "name": name,
-                "model": manufacturer,
-                "ip": ip,
-            }
-        )
 
-    return {"results": oxidized_devices}
+# ── Incremental sync ─────────────────────────────────────────────────────────
+
+
+def _timestamp(value):
+    """Parse a NetBox ISO 8601 timestamp (Python 3.10's fromisoformat() rejects the Z suffix)."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class DeviceInventory:
+    """Transformed device map kept in sync with NetBox using last_updated deltas.
+
+    Devices are keyed by NetBox ID. A delta sync only fetches devices changed
+    since the newest last_updated seen so far; a full sync replaces the map and
+    so also drops devices that were deleted or stopped matching DEVICE_FILTERS.
+    """
+
+    def __init__(self, state_file="", full_sync_interval=3600):
+        self.state_file = state_file
+        self.full_sync_interval = full_sync_interval
+        self.devices = {}
+        self.watermark = None
+        self.last_full_sync = 0.0
+        # Devices touched by a webhook since the last sync; dropped if the delta doesn't return them
+        self.pending = set()
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Restore the device map from the state file, if present."""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            self.devices = {int(k): v for k, v in state.get("devices", {}).items()}
+            self.watermark = state.get("watermark")
+            self.last_full_sync = state.get("last_full_sync", 0.0)
+            print(f"Loaded {len(self.devices)} devices from {self.state_file}")
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable state file {self.state_file}: {e}")
+
+    def _save(self):
+        """Atomically write the device map to the state file."""
+        if not self.state_file:
+            return
+        state = {
+            "watermark": self.watermark,
+            "last_full_sync": self.last_full_sync,
+            "devices": self.devices,
+        }
+        tmp_path = f"{self.state_file}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            print(f"Failed to write state file {self.state_file}: {e}")
+
+    @staticmethod
+    def _sync_entry(device):
+        """Transform a fetched device to (id, last_updated, Oxidized entry or None)."""
+        if device.get("id") is None:
+            return None
+        return device["id"], device.get("last_updated"), transform_device(device)
+
+    def _apply(self, devices):
+        """Merge fetched _sync_entry() tuples into the map and advance the watermark.
+
+        Returns:
+            True if an entry or the watermark changed.
+        """
+        changed = False
+        for device_id, last_updated, entry in devices:
+            if entry:
+                if self.devices.get(device_id) != entry:
+                    self.devices[device_id] = entry
+                    changed = True
+            elif self.devices.pop(device_id, None) is not None:
+                changed = True
+            if last_updated and (self.watermark is None or _timestamp(last_updated) > _timestamp(self.watermark)):
+                self.watermark = last_updated
+                changed = True
+        return changed
+
+    def sync(self):
+        """Bring the map up to date, running a full sync when one is due.
+
+        Returns:
+            Error dict from fetch_devices() if NetBox could not be queried, else None.
+        """
+        full = self.watermark is None or time.time() - self.last_full_sync >= self.full_sync_interval
+
+        if full:
+            devices = fetch_devices(transform=self._sync_entry)
+        else:
+            devices = fetch_devices([("last_updated__gte", self.watermark)], transform=self._sync_entry)
+        if isinstance(devices, dict):
+            return devices
+
+        changed = full
+        if full:
+            self.devices = {}
+            self.watermark = None
+            self.last_full_sync = time.time()
+        else:
+            # Webhook-flagged devices missing from the delta no longer match the filters
+            returned = {device[0] for device in devices}
+            for device_id in self.pending - returned:
+                if self.devices.pop(device_id, None) is not None:
+                    changed = True
+        self.pending.clear()
+
+        # The last_updated__gte delta always returns the watermark device, so only
+        # rewrite the state file when something actually changed
+        if self._apply(devices) or changed:
+            self._save()
+        return None
+
+    def refresh(self):
+        """Sync with NetBox and return the Oxidized source document.
+
+        If NetBox is unreachable the last known device list is served rather
+        than an error, so Oxidized keeps its inventory.
+        """
+        with self.lock:
+            error = self.sync()
+            if error and not self.devices:
+                return error
+            if error:
+                print(f"NetBox sync failed, serving cached device list: {error['error']}")
+            return {"results": list(self.devices.values())}
+
+    def handle_webhook(self, payload):
+        """Apply a NetBox device webhook event.
+
+        Deletions are removed immediately. Creates and updates are flagged so the
+        next delta sync re-fetches them through DEVICE_FILTERS.
+        """
+        if payload.get("model") != "device":
+            return
+        device_id = (payload.get("data") or {}).get("id")
+        if device_id is None:
+            return
+
+        with self.lock:
+            if payload.get("event") == "deleted":
+                if self.devices.pop(device_id, None) is not None:
+                    self._save()
+            else:
+                self.pending.add(device_id)
+
+
+def verify_signature(body, signature):
+    """Check a NetBox webhook X-Hook-Signature (HMAC-SHA512 of the body)."""
+    if not WEBHOOK_SECRET:
+        return True
+    expected = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
 
 
 # ── HTTP server ──────────────────────────────────────────────────────────────
@@ -123,10 +391,11 @@ def serve(port):
     """Run a simple HTTP server that returns the device list on every request."""
     from http.server import BaseHTTPRequestHandler, HTTPServer
 
+    inventory = DeviceInventory(STATE_FILE, FULL_SYNC_INTERVAL)
+
     class Handler(BaseHTTPRequestHandler):
         def do_GET(self):
-            devices = fetch_devices()
-            output = transform_devices(devices)
+            output = inventory.refresh()
             payload = json.dumps(output).encode()
 
             self.send_response(200)
@@ -135,6 +404,24 @@ def serve(port):
             self.end_headers()
             self.wfile.write(payload)
 
+        def do_POST(self):
+            if self.path.rstrip("/") != "/webhook":
+                self.send_error(404)
+                return
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not verify_signature(body, self.headers.get("X-Hook-Signature")):
+                self.send_error(403, "Invalid webhook signature")
+                return
+            try:
+                inventory.handle_webhook(json.loads(body))
+            except (ValueError, AttributeError):
+                self.send_error(400, "Invalid webhook payload")
+                return
+
+            self.send_response(204)
+            self.end_headers()
+
         def log_message(self, fmt, *args):
             # Minimal logging
             print(f"{self.client_address[0]} - {args[0]}")
@@ -142,7 +429,10 @@ def serve(port):
     print(f"Serving NetBox device list on http://0.0.0.0:{port}/")
     print(f"  NETBOX_URL:      {NETBOX_URL}")
     print(f"  DEVICE_FILTERS:  {DEVICE_FILTERS}")
+    print(f"  PAGE_SIZE:       {PAGE_SIZE} ({FETCH_WORKERS} workers)")
     print(f"  DOMAIN_SUFFIX:   {DOMAIN_SUFFIX or '(none)'}")
+    print(f"  FULL_SYNC:       every {FULL_SYNC_INTERVAL}s")
+    print(f"  STATE_FILE:      {STATE_FILE or '(none)'}")
     HTTPServer(("0.0.0.0", port), Handler).serve_forever()
 
 
@@ -159,7 +449,7 @@ def main():
         serve(args.port)
     else:
         devices = fetch_devices()
-        output = transform_devices(devices)
+        output = devices if isinstance(devices, dict) else {"results": devices}
         print(json.dumps(output, indent=2))
 
 
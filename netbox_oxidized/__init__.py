@@ -19,7 +19,7 @@ class OxidizedConfig(PluginConfig):
     author = "Jeremy Worden"
     author_email = "jeremy.worden@gmail.com"
     base_url = "oxidized"
-    min_version = "4.0.0"
+    min_version = "4.2.0"
     max_version = "5.99"
 
     required_settings = []
@@ -30,6 +30,17 @@ class OxidizedConfig(PluginConfig):
         "timeout": 30,
         "cache_timeout": 300,
         "verify_ssl": False,
+        # Limits on requests to Oxidized across all workers and hosts (0 = unlimited); needs a shared cache
+        "max_concurrent_requests": 8,
+        "max_requests_per_second": 0,
+        # Path to Oxidized's git output (bare or working tree); configs are read from it instead of HTTP
+        "git_repo": "",
+        # Keep configs in bulk operations as shared, interned lines (lower memory on template-heavy fleets)
+        "intern_config_lines": False,
+        # Default number of matching lines shown per device in config search
+        "search_line_limit": 10,
+        # Shared token for the Oxidized hook receiver (/plugins/oxidized/hook/); empty disables it
+        "hook_token": "",
         # Device filter - empty lists mean show for all
         "device_roles": [],
         "manufacturers": [],
@@ -37,7 +48,7 @@ class OxidizedConfig(PluginConfig):
 
     def ready(self):
         super().ready()
-        from . import widgets  # noqa: F401
+        from . import signals, widgets  # noqa: F401
 
 
 config = OxidizedConfig
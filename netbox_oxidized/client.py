@@ -1,32 +1,94 @@
 """API client for Oxidized REST API integration."""
 
+import base64
+import bisect
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import itemgetter
 from typing import Optional
 
 import requests
 from django.conf import settings
 from django.core.cache import cache
 
+from .limiter import PRIORITY_BACKGROUND, PRIORITY_BULK, PRIORITY_INTERACTIVE, OxidizedRequestLimiter, lower_priority
+from .parser import parent_line
+from .storage import get_git_backend
+from .store import ConfigStore, content_hash
+from .utils import build_age_index, parse_backup_time
+
 logger = logging.getLogger(__name__)
 
+NODES_CACHE_KEY = "netbox_oxidized_all_nodes"
+CONFIG_CACHE_PREFIX = "netbox_oxidized_config_"
+AGE_INDEX_CACHE_KEY = "netbox_oxidized_age_index"
+# Keys per cache.get_many()/set_many() round trip in bulk operations
+BULK_CHUNK_SIZE = 500
+SEARCH_CACHE_PREFIX = "netbox_oxidized_search_"
+# Sequence-numbered log of nodes whose config changed, written by the Oxidized hook receiver
+CONFIG_CHANGES_CACHE_KEY = "netbox_oxidized_config_changes"
+SEARCH_SORTS = ("matches", "name", "age")
+
+
+def _encode_cursor(sort: str, direction: str, key: list) -> str:
+    """Encode a search page cursor: the sort key to page after or before."""
+    return base64.urlsafe_b64encode(json.dumps([sort, direction, key]).encode()).decode()
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple[Optional[str], Optional[list]]:
+    """Decode a search page cursor; empty, invalid or other-sort cursors mean the first page."""
+    if not cursor:
+        return None, None
+    try:
+        cursor_sort, direction, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None, None
+    if cursor_sort != sort or direction not in ("after", "before") or not isinstance(key, list):
+        return None, None
+    return direction, key
+
 
 class OxidizedClient:
     """Client for Oxidized REST API with caching and error handling."""
 
-    def __init__(self):
-        """Initialize the client from plugin settings."""
+    def __init__(self, priority: str = PRIORITY_INTERACTIVE):
+        """Initialize the client from plugin settings.
+
+        Args:
+            priority: Limiter lane for this client's requests to Oxidized.
+        """
         self.config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
         self.base_url = self.config.get("oxidized_url", "").rstrip("/")
         self.timeout = self.config.get("timeout", 30)
         self.cache_timeout = self.config.get("cache_timeout", 300)
         self.verify_ssl = self.config.get("verify_ssl", False)
-
-    def _make_request(self, endpoint: str, expect_json: bool = True):
+        self.priority = priority
+        self.limiter = OxidizedRequestLimiter(
+            max_concurrent=self.config.get("max_concurrent_requests", 8),
+            max_per_second=self.config.get("max_requests_per_second", 0),
+            timeout=self.timeout,
+        )
+        # Optional local git backend: read configs from Oxidized's repository instead of HTTP
+        self.git_repo = self.config.get("git_repo", "")
+        self.git = get_git_backend(self.git_repo) if self.git_repo else None
+        # Per-instance memo of nodes.json and a name/full_name index over it
+        self._nodes = None
+        self._node_index = None
+        # Configs loaded by this client, deduplicated by content
+        self.store = ConfigStore(intern_lines=self.config.get("intern_config_lines", False))
+
+    def _make_request(self, endpoint: str, expect_json: bool = True, priority: Optional[str] = None):
         """Make request to Oxidized REST API.
 
+        Requests wait for a slot from the shared limiter, so the load on
+        Oxidized stays capped across all workers and hosts.
+
         Args:
             endpoint: API endpoint path (e.g., 'nodes.json', 'node/fetch/hostname')
             expect_json: If True, parse response as JSON. If False, return text.
+            priority: Limiter lane; defaults to the client's priority.
 
         Returns:
             Parsed JSON (dict or list), text string, or None on error.
@@ -34,11 +96,14 @@ class OxidizedClient:
         url = f"{self.base_url}/{endpoint}"
 
         try:
-            response = requests.get(
-                url,
-                timeout=self.timeout,
-                verify=self.verify_ssl,
-            )
+            with self.limiter.slot(priority or self.priority) as acquired:
+                if not acquired:
+                    return None
+                response = requests.get(
+                    url,
+                    timeout=self.timeout,
+                    verify=self.verify_ssl,
+                )
             response.raise_for_status()
             if expect_json:
                 return response.json()
@@ -51,19 +116,68 @@ class OxidizedClient:
             return None
 
     def _get_all_nodes(self) -> list:
-        """Get all nodes from /nodes.json with caching."""
-        cache_key = "netbox_oxidized_all_nodes"
-        cached = cache.get(cache_key)
+        """Get all nodes from /nodes.json with caching.
+
+        The list is also memoized on the instance, so repeated lookups within
+        one request don't go back to the cache.
+        """
+        if self._nodes is not None:
+            return self._nodes
+
+        cached = cache.get(NODES_CACHE_KEY)
         if cached is not None:
+            self._nodes = cached
+            self._update_node_mapping(cached, refreshed=False)
             return cached
 
         result = self._make_request("nodes.json")
         if result and isinstance(result, list):
-            cache.set(cache_key, result, self.cache_timeout)
+            cache.set_many(
+                {NODES_CACHE_KEY: result, AGE_INDEX_CACHE_KEY: build_age_index(result)},
+                self.cache_timeout,
+            )
+            self._nodes = result
+            self._update_node_mapping(result, refreshed=True)
             return result
 
         return []
 
+    def _update_node_mapping(self, nodes: list, refreshed: bool):
+        """Keep the node to device mapping in step with the node list.
+
+        A refreshed list is compared against the one the mapping was built
+        from; a cached list only triggers a rebuild if the mapping has been
+        invalidated (e.g. a device was saved). Background clients (jobs and
+        management commands) rebuild directly; web requests queue a
+        NodeMappingJob and keep using the existing mapping until it has run.
+        Errors are logged, never raised.
+        """
+        from .mapping import is_mapping_current, schedule_node_mapping, sync_node_mapping
+
+        try:
+            if is_mapping_current(nodes, check_hash=refreshed):
+                return
+            if self.priority == PRIORITY_BACKGROUND:
+                sync_node_mapping(nodes)
+            else:
+                schedule_node_mapping()
+        except Exception as e:
+            logger.error(f"Failed to update Oxidized node mapping: {e}")
+
+    def get_age_index(self) -> dict:
+        """Get nodes indexed by backup age (see utils.build_age_index).
+
+        The index is rebuilt whenever nodes.json is refreshed from Oxidized
+        and cached alongside it.
+        """
+        index = cache.get(AGE_INDEX_CACHE_KEY)
+        if index is None:
+            nodes = self._get_all_nodes()
+            index = build_age_index(nodes)
+            if nodes:
+                cache.set(AGE_INDEX_CACHE_KEY, index, self.cache_timeout)
+        return index
+
     def get_node(self, name: str) -> dict:
         """Get node status information by looking up in /nodes.json.
 
@@ -73,11 +187,17 @@ class OxidizedClient:
         Returns:
             Dict with node info (name, model, status, last backup time) or error.
         """
-        nodes = self._get_all_nodes()
-        for node in nodes:
-            if node.get("name") == name or node.get("full_name") == name:
-                node["cached"] = False
-                return node
+        if self._node_index is None:
+            index = {}
+            for node in self._get_all_nodes():
+                index.setdefault(node.get("full_name"), node)
+                index.setdefault(node.get("name"), node)
+            self._node_index = index
+
+        node = self._node_index.get(name)
+        if node is not None:
+            node["cached"] = False
+            return node
 
         return {"error": f"Node '{name}' not found in Oxidized", "cached": False}
 
@@ -90,9 +210,17 @@ class OxidizedClient:
         Returns:
             Dict with 'config' key containing the config text, or 'error' key.
         """
-        cache_key = f"netbox_oxidized_config_{name}"
+        if self.git:
+            # Local reads are cheaper than a cache round trip, so bypass the cache
+            config_text = self.git.get_config(name)
+            if config_text is not None:
+                return {"config": self.store.put(name, config_text), "cached": False}
+            return {"error": f"Config not found for '{name}'", "cached": False}
+
+        cache_key = f"{CONFIG_CACHE_PREFIX}{name}"
         cached = cache.get(cache_key)
         if cached:
+            cached["config"] = self.store.put(name, cached["config"])
             cached["cached"] = True
             return cached
 
@@ -100,51 +228,284 @@ class OxidizedClient:
         if config_text is not None:
             result = {"config": config_text, "cached": False}
             cache.set(cache_key, result, self.cache_timeout)
+            result["config"] = self.store.put(name, config_text)
             return result
 
         return {"error": f"Config not found for '{name}'", "cached": False}
 
-    def search_configs(self, query: str) -> list[dict]:
-        """Search all node configurations for a term.
+    def _fetch_config(self, name: str, priority: Optional[str] = None) -> Optional[str]:
+        """Fetch a node's config from Oxidized and replace its cache entry.
+
+        The config is not added to the store, so this is safe to call from
+        worker threads.
+        """
+        config_text = self._make_request(f"node/fetch/{name}", expect_json=False, priority=priority)
+        if config_text is not None:
+            cache.set(f"{CONFIG_CACHE_PREFIX}{name}", {"config": config_text, "cached": False}, self.cache_timeout)
+        return config_text
+
+    def refresh_node_config(self, name: str, priority: Optional[str] = None) -> bool:
+        """Fetch a node's config from Oxidized and replace its cache entry.
 
         Args:
-            query: Search term to look for in configs.
+            name: Node name.
+            priority: Limiter lane; defaults to the client's priority.
 
         Returns:
-            List of dicts with node name and matching lines.
+            True if the config was fetched and cached.
         """
-        nodes = self._get_all_nodes()
-        results = []
+        return self._fetch_config(name, priority=priority) is not None
+
+    def iter_node_configs(self, names: list[str], workers: int = 4):
+        """Yield (name, config text or None) for many nodes, in order, without keeping them.
+
+        Configs are read from the cache one chunk of BULK_CHUNK_SIZE names at a
+        time and cache misses are fetched with at most `workers` concurrent
+        requests, so memory use is bounded by one chunk however many nodes
+        are requested. Nothing is added to the store.
+        """
+        if self.git:
+            for name in names:
+                yield name, self.git.get_config(name)
+            return
+
+        bulk_priority = lower_priority(self.priority, PRIORITY_BULK)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for start in range(0, len(names), BULK_CHUNK_SIZE):
+                chunk = names[start : start + BULK_CHUNK_SIZE]
+                keys = {name: f"{CONFIG_CACHE_PREFIX}{name}" for name in chunk}
+                cached = cache.get_many(list(keys.values()))
+                configs = {name: cached[key]["config"] for name, key in keys.items() if cached.get(key)}
+                missing = [name for name in chunk if name not in configs]
+                configs.update(zip(missing, pool.map(lambda name: self._fetch_config(name, bulk_priority), missing)))
+                for name in chunk:
+                    yield name, configs[name]
+
+    def _load_configs(self, names: list[str]) -> dict[str, bool]:
+        """Load configs for many nodes into the store.
+
+        Cache reads and writes are batched with get_many()/set_many() in chunks
+        of BULK_CHUNK_SIZE, so a cache-warm bulk lookup costs one round trip
+        per chunk rather than one per node. Nodes already in the store are
+        not looked up again.
 
-        for node in nodes:
-            name = node.get("name", "")
-            if not name:
-                continue
+        Returns:
+            Dict mapping each loaded name to whether it came from the cache.
+            Names whose config could not be fetched are omitted.
+        """
+        loaded = {name: True for name in names if name in self.store}
+        pending = [name for name in names if name not in loaded]
+
+        if self.git:
+            for name in pending:
+                config_text = self.git.get_config(name)
+                if config_text is not None:
+                    self.store.put(name, config_text)
+                    loaded[name] = False
+            return loaded
+
+        # Bulk fetches never run above the bulk lane, leaving room for device tab lookups
+        bulk_priority = lower_priority(self.priority, PRIORITY_BULK)
+        for start in range(0, len(pending), BULK_CHUNK_SIZE):
+            keys = {f"{CONFIG_CACHE_PREFIX}{name}": name for name in pending[start : start + BULK_CHUNK_SIZE]}
+            cached = cache.get_many(list(keys))
+            fetched = {}
+
+            for key, name in keys.items():
+                if cached.get(key):
+                    self.store.put(name, cached[key]["config"])
+                    loaded[name] = True
+                    continue
+
+                config_text = self._make_request(f"node/fetch/{name}", expect_json=False, priority=bulk_priority)
+                if config_text is not None:
+                    fetched[key] = {"config": config_text, "cached": False}
+                    self.store.put(name, config_text)
+                    loaded[name] = False
+
+            if fetched:
+                cache.set_many(fetched, self.cache_timeout)
+
+        return loaded
+
+    def get_node_versions(self, name: str, limit: int = 20) -> list[dict]:
+        """Get version history for a node from the git backend, newest first.
+
+        Args:
+            name: Node name or full name (group/name).
+            limit: Maximum number of versions to return.
+
+        Returns:
+            List of dicts with oid, date, author and message. Empty if no git_repo is configured.
+        """
+        if not self.git:
+            return []
+        return self.git.get_versions(name, limit)
+
+    def _count_matches(self, name: str, needle: str, section: str = "") -> int:
+        """Count lines of a stored config containing a lowercase needle."""
+        if section:
+            parsed = self.store.parsed(name, evict=False)
+            return parsed.count(needle, section) if parsed else 0
+        return sum(1 for line in self.store.lines(name) if needle in line.lower())
+
+    def _search_index(self, query: str, section: str = "") -> list[list]:
+        """Count matching lines per node for a query, optionally within one config section.
+
+        Only [name, match_count] pairs are kept, and the result is cached per
+        query and section, so paging through results doesn't rescan every config.
+        A cached result older than the config change log (see hooks.py) is
+        brought up to date by recounting only the nodes whose config changed.
+        Nodes whose config could not be loaded are left out, and a result
+        missing any of them (or built from an empty node list, e.g. while
+        Oxidized is down) is not cached, so the next search tries again.
+        """
+        needle = query.lower()
+        cache_key = f"{SEARCH_CACHE_PREFIX}{content_hash(f'{section}|{needle}')}"
+        cached = cache.get_many([cache_key, CONFIG_CHANGES_CACHE_KEY])
+        changes = cached.get(CONFIG_CHANGES_CACHE_KEY) or {"seq": 0, "floor": 0, "nodes": {}}
+        entry = cached.get(cache_key)
+
+        if entry is not None and entry["seq"] == changes["seq"]:
+            return entry["index"]
+
+        if entry is not None and entry["seq"] >= changes["floor"]:
+            changed = [name for name, seq in changes["nodes"].items() if seq > entry["seq"]]
+            counts = dict(entry["index"])
+            loaded = self._load_configs(changed)
+            for name in changed:
+                if name not in loaded:
+                    # Keep the previous count until the config can be loaded again
+                    continue
+                count = self._count_matches(name, needle, section)
+                if count:
+                    counts[name] = count
+                else:
+                    counts.pop(name, None)
+            self.store.clear()
+            index = [[name, count] for name, count in counts.items()]
+            if len(loaded) == len(changed):
+                cache.set(cache_key, {"seq": changes["seq"], "index": index}, self.cache_timeout)
+            return index
+
+        names = [node["name"] for node in self._get_all_nodes() if node.get("name")]
+        index = []
+        failed = 0
+
+        # Load configs a chunk at a time; only the counts are kept
+        for start in range(0, len(names), BULK_CHUNK_SIZE):
+            chunk = names[start : start + BULK_CHUNK_SIZE]
+            loaded = self._load_configs(chunk)
+            failed += len(chunk) - len(loaded)
+            for name in chunk:
+                if name not in loaded:
+                    continue
+                count = self._count_matches(name, needle, section)
+                if count:
+                    index.append([name, count])
+            self.store.clear()
+
+        if failed:
+            logger.warning(f"Config search skipped {failed} nodes whose config could not be loaded")
+        elif names:
+            cache.set(cache_key, {"seq": changes["seq"], "index": index}, self.cache_timeout)
+        return index
+
+    def _search_sort_key(self, sort: str, name: str, match_count: int) -> list:
+        """Sort key for a search result; always ends with the name so keys are unique."""
+        if sort == "name":
+            return [name]
+        if sort == "age":
+            # Oldest backup first; nodes without a backup sort before all others
+            backup_time = parse_backup_time(self.get_node(name))
+            return [backup_time.timestamp() if backup_time else 0, name]
+        return [-match_count, name]
+
+    def search_configs(
+        self,
+        query: str,
+        sort: str = "matches",
+        cursor: str = "",
+        page_size: int = 50,
+        line_limit: int = 10,
+        section: str = "",
+    ) -> dict:
+        """Search all node configurations for a term, one page at a time.
+
+        Match counts for every node come from _search_index(); matching lines
+        are only collected for the nodes on the requested page.
 
-            config_data = self.get_node_config(name)
-            config_text = config_data.get("config", "")
-            if not config_text:
-                continue
+        Args:
+            query: Search term to look for in configs.
+            sort: One of SEARCH_SORTS: "matches" (most first), "name", or "age" (oldest backup first).
+            cursor: Opaque cursor from a previous page's next_cursor/prev_cursor; empty for the first page.
+            page_size: Number of devices per page.
+            line_limit: Maximum matching lines returned per device.
+            section: Only match lines within this top-level section (e.g. "interface", "router bgp").
 
-            # Find matching lines
+        Returns:
+            Dict with the page of results (node info and matching lines with their parent line),
+            total device and match counts, and next/previous page cursors.
+        """
+        if sort not in SEARCH_SORTS:
+            sort = "matches"
+        needle = query.lower()
+        index = self._search_index(query, section)
+
+        entries = sorted(
+            ([self._search_sort_key(sort, name, count), name, count] for name, count in index),
+            key=itemgetter(0),
+        )
+        keys = [entry[0] for entry in entries]
+
+        direction, key = _decode_cursor(cursor, sort)
+        if direction == "after":
+            start = bisect.bisect_right(keys, key)
+        elif direction == "before":
+            start = max(0, bisect.bisect_left(keys, key) - page_size)
+        else:
+            start = 0
+        page = entries[start : start + page_size]
+
+        self._load_configs([name for _, name, _ in page])
+        results = []
+        for _, name, count in page:
+            node = self.get_node(name)
+            # Only a section search needs the parsed block tree; parents are looked up directly otherwise
+            if section:
+                parsed = self.store.parsed(name)
+                lines = parsed.lines if parsed else ()
+                found = parsed.find(needle, section) if parsed else ()
+                get_parent = parsed.parent if parsed else None
+            else:
+                lines = self.store.lines(name)
+                found = (i for i, line in enumerate(lines) if needle in line.lower())
+                get_parent = partial(parent_line, lines)
             matching_lines = []
-            for i, line in enumerate(config_text.splitlines(), 1):
-                if query.lower() in line.lower():
-                    matching_lines.append({"number": i, "text": line})
-
-            if matching_lines:
-                results.append(
-                    {
-                        "name": name,
-                        "full_name": node.get("full_name", name),
-                        "model": node.get("model", ""),
-                        "status": node.get("status", ""),
-                        "match_count": len(matching_lines),
-                        "matching_lines": matching_lines[:10],  # Limit to 10 lines per device
-                    }
-                )
+            for i in found:
+                matching_lines.append({"number": i + 1, "text": lines[i], "parent": get_parent(i)})
+                if len(matching_lines) >= line_limit:
+                    break
+
+            results.append(
+                {
+                    "name": name,
+                    "full_name": node.get("full_name", name),
+                    "model": node.get("model", ""),
+                    "status": node.get("status", ""),
+                    "match_count": count,
+                    "matching_lines": matching_lines,
+                }
+            )
 
-        return results
+        return {
+            "results": results,
+            "total": len(entries),
+            "total_matches": sum(entry[2] for entry in entries),
+            "start": start,
+            "next_cursor": _encode_cursor(sort, "after", page[-1][0]) if start + page_size < len(entries) else "",
+            "prev_cursor": _encode_cursor(sort, "before", page[0][0]) if page and start > 0 else "",
+        }
 
     def test_connection(self) -> tuple[bool, str]:
         """Test connection to Oxidized API.
@@ -152,6 +513,9 @@ class OxidizedClient:
         Returns:
             Tuple of (success, message).
         """
+        if self.git_repo and not self.git:
+            return False, f"Failed to open git repository {self.git_repo}"
+
         result = self._make_request("nodes.json")
         if result is not None:
             if isinstance(result, list):
@@ -160,10 +524,24 @@ class OxidizedClient:
         return False, f"Failed to connect to {self.base_url}"
 
 
-def get_client() -> Optional[OxidizedClient]:
-    """Get a configured client instance, or None if not configured."""
+def get_client(request=None, priority: str = PRIORITY_INTERACTIVE) -> Optional[OxidizedClient]:
+    """Get a configured client instance, or None if not configured.
+
+    Args:
+        request: Optional HTTP request. The client is memoized on it, so every
+            lookup within one request shares the same client and node data.
+        priority: Limiter lane for the client's requests to Oxidized.
+    """
+    if request is not None and hasattr(request, "_netbox_oxidized_client"):
+        return request._netbox_oxidized_client
+
     config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
     if not config.get("oxidized_url"):
         logger.warning("Oxidized URL not configured")
-        return None
-    return OxidizedClient()
+        client = None
+    else:
+        client = OxidizedClient(priority=priority)
+
+    if request is not None:
+        request._netbox_oxidized_client = client
+    return client
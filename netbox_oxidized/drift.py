@@ -0,0 +1,203 @@
+"""Fleet config drift detection using MinHash fingerprints of config line sets."""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from .client import BULK_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# One-permutation MinHash: each line hash lands in one of NUM_BINS bins and
+# each bin keeps its minimum, so a fingerprint costs one hash per line.
+NUM_BINS = 64
+EMPTY_BIN = 1 << 58
+# LSH banding: configs sharing every bin of any band land in the same cluster.
+# 8 bands of 8 bins puts the collision threshold at roughly 0.77 similarity.
+LSH_BANDS = 8
+LSH_ROWS = NUM_BINS // LSH_BANDS
+# Candidates scored when searching for the medoid of the largest cluster
+MEDOID_CANDIDATES = 30
+
+# Fingerprints are keyed by config content hash, so they never go stale
+FINGERPRINT_CACHE_PREFIX = "netbox_oxidized_fingerprint_"
+FINGERPRINT_CACHE_TIMEOUT = 7 * 24 * 3600
+
+
+def fingerprint(lines) -> list[int]:
+    """Compute a MinHash fingerprint of a config's set of significant lines.
+
+    Blank lines and ``!`` comment lines are ignored and whitespace is
+    stripped, so fingerprints compare what is configured rather than layout.
+    """
+    bins = [EMPTY_BIN] * NUM_BINS
+    for line in {line.strip() for line in lines}:
+        if not line or line.startswith("!"):
+            continue
+        value = int.from_bytes(hashlib.blake2b(line.encode(), digest_size=8).digest(), "big")
+        index, value = value % NUM_BINS, value // NUM_BINS
+        if value < bins[index]:
+            bins[index] = value
+    return bins
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimate the Jaccard similarity of two configs' line sets from their fingerprints."""
+    matches = total = 0
+    for x, y in zip(a, b):
+        if x == EMPTY_BIN and y == EMPTY_BIN:
+            continue
+        total += 1
+        if x == y:
+            matches += 1
+    return matches / total if total else 1.0
+
+
+def cluster(fingerprints: dict[str, list[int]]) -> dict[str, int]:
+    """Group near-identical configs using LSH banding.
+
+    Returns:
+        Dict mapping each name to a cluster id; clusters are numbered by
+        descending size, so cluster 0 is the largest.
+    """
+    parent = {name: name for name in fingerprints}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for band in range(LSH_BANDS):
+        buckets = {}
+        for name, bins in fingerprints.items():
+            key = tuple(bins[band * LSH_ROWS : (band + 1) * LSH_ROWS])
+            if all(value == EMPTY_BIN for value in key):
+                continue
+            other = buckets.setdefault(key, name)
+            if other != name:
+                parent[find(name)] = find(other)
+
+    members = {}
+    for name in fingerprints:
+        members.setdefault(find(name), []).append(name)
+    ordered = sorted(members.values(), key=lambda names: (-len(names), min(names)))
+    return {name: cluster_id for cluster_id, names in enumerate(ordered) for name in names}
+
+
+def find_medoid(fingerprints: dict[str, list[int]], clusters: dict[str, int]) -> str:
+    """Approximate the group medoid: the member of the largest cluster closest to all others.
+
+    Only a sample of MEDOID_CANDIDATES members is scored, keeping this linear
+    in the group size.
+    """
+    largest = sorted(name for name, cluster_id in clusters.items() if cluster_id == 0)
+    step = max(1, len(largest) // MEDOID_CANDIDATES)
+    candidates = largest[::step][:MEDOID_CANDIDATES]
+
+    def total_similarity(candidate):
+        bins = fingerprints[candidate]
+        return sum(similarity(bins, other) for other in fingerprints.values())
+
+    return max(candidates, key=total_similarity)
+
+
+def get_fingerprints(client, names: list[str]) -> dict[str, list[int]]:
+    """Fingerprint the current config of each node, reusing the plugin's caches.
+
+    Configs are loaded through the client in chunks (batched config cache
+    access), and fingerprints are cached by config content hash so unchanged
+    configs are not re-hashed on the next run. Nodes without a config are
+    omitted.
+    """
+    fingerprints = {}
+    for start in range(0, len(names), BULK_CHUNK_SIZE):
+        chunk = names[start : start + BULK_CHUNK_SIZE]
+        client._load_configs(chunk)
+
+        digests = {name: client.store.digest(name) for name in chunk if name in client.store}
+        keys = {f"{FINGERPRINT_CACHE_PREFIX}{digest}" for digest in digests.values()}
+        cached = cache.get_many(list(keys))
+        computed = {}
+
+        for name, digest in digests.items():
+            key = f"{FINGERPRINT_CACHE_PREFIX}{digest}"
+            bins = cached.get(key) or computed.get(key)
+            if bins is None:
+                bins = computed[key] = fingerprint(client.store.lines(name))
+            fingerprints[name] = bins
+
+        if computed:
+            cache.set_many(computed, FINGERPRINT_CACHE_TIMEOUT)
+        # Only fingerprints are needed from here on
+        client.store.clear()
+
+    return fingerprints
+
+
+def build_drift_report(client, names: list[str], golden: str = "", threshold: float = 0.1) -> dict:
+    """Compare a group of devices against a golden config or the group medoid.
+
+    Args:
+        client: OxidizedClient used to load configs.
+        names: Oxidized node names in the group.
+        golden: Node name of the golden config. If empty, the medoid of the
+            largest similarity cluster is used as the reference.
+        threshold: Estimated distance (1 - Jaccard) above which a device is an outlier.
+
+    Returns:
+        JSON-serializable report with the reference, clusters, and devices
+        ranked by distance from the reference.
+    """
+    fingerprints = get_fingerprints(client, sorted(set(names) | ({golden} if golden else set())))
+    missing = sorted(name for name in names if name not in fingerprints)
+
+    report = {
+        "generated": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "device_count": len(names),
+        "missing": missing,
+        "threshold": threshold,
+        "reference": golden,
+        "reference_type": "golden" if golden else "medoid",
+        "clusters": [],
+        "devices": [],
+    }
+
+    if golden and golden not in fingerprints:
+        report["error"] = f"No config available for golden device {golden}"
+        return report
+    if not fingerprints:
+        report["error"] = "No configs available for the selected devices"
+        return report
+
+    clusters = cluster(fingerprints)
+    reference = golden or find_medoid(fingerprints, clusters)
+    reference_bins = fingerprints[reference]
+    report["reference"] = reference
+
+    sizes = {}
+    for name in names:
+        if name in clusters:
+            sizes[clusters[name]] = sizes.get(clusters[name], 0) + 1
+    report["clusters"] = [{"id": cluster_id, "size": size} for cluster_id, size in sorted(sizes.items())]
+
+    devices = []
+    for name in names:
+        if name not in fingerprints or name == reference:
+            continue
+        distance = round(1 - similarity(reference_bins, fingerprints[name]), 3)
+        devices.append(
+            {
+                "name": name,
+                "distance": distance,
+                "cluster": clusters[name],
+                "outlier": distance > threshold,
+            }
+        )
+    devices.sort(key=lambda device: (-device["distance"], device["name"]))
+    report["devices"] = devices
+    report["outlier_count"] = sum(1 for device in devices if device["outlier"])
+
+    return report
@@ -0,0 +1,123 @@
+"""Streaming export of node configs as tar.gz or zip archives."""
+
+import io
+import tarfile
+import time
+import zipfile
+from datetime import datetime, timezone
+
+from .mapping import get_mapped_node_names
+from .utils import parse_backup_time
+
+EXPORT_FORMATS = {
+    "tar.gz": "application/gzip",
+    "zip": "application/zip",
+}
+
+
+class _StreamBuffer:
+    """Write-only file object whose contents are drained after each archive member."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def get_export_node_names(client, roles=(), sites=(), manufacturers=(), tags=(), query="", section="") -> list[str]:
+    """Get Oxidized node names to export.
+
+    Device filters match NetBox devices by slug and are combined; a search
+    query limits the export to nodes whose configs match it. With no filters
+    every node is exported.
+    """
+    names = [node["name"] for node in client._get_all_nodes() if node.get("name")]
+
+    filters = {}
+    if roles:
+        filters["role__slug__in"] = roles
+    if sites:
+        filters["site__slug__in"] = sites
+    if manufacturers:
+        filters["device_type__manufacturer__slug__in"] = manufacturers
+    if tags:
+        filters["tags__slug__in"] = tags
+    if filters:
+        mapped = set(get_mapped_node_names(**filters))
+        names = [name for name in names if name in mapped]
+
+    if query:
+        matched = {name for name, _ in client._search_index(query, section)}
+        names = [name for name in names if name in matched]
+
+    return sorted(names)
+
+
+def get_export_filename(fmt: str) -> str:
+    """Get the download filename for an export."""
+    return f"oxidized-configs-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{fmt}"
+
+
+def stream_archive(client, names: list[str], fmt: str = "tar.gz", workers: int = 4):
+    """Yield an archive of node configs piece by piece.
+
+    Each config is written to the archive and handed out as soon as it is
+    fetched, so memory use does not grow with the number of nodes. Nodes
+    without a config are listed in MISSING.txt at the end of the archive.
+
+    Args:
+        client: OxidizedClient used to read configs.
+        names: Node names to export.
+        fmt: Archive format, one of EXPORT_FORMATS.
+        workers: Maximum concurrent requests to Oxidized for uncached configs.
+
+    Yields:
+        Chunks of the archive as bytes.
+    """
+    buffer = _StreamBuffer()
+    root = get_export_filename(fmt)[: -len(fmt) - 1]
+    missing = []
+
+    if fmt == "zip":
+        archive = zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+        def add(path, data, mtime):
+            info = zipfile.ZipInfo(f"{root}/{path}", time.gmtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
+
+    else:
+        archive = tarfile.open(fileobj=buffer, mode="w|gz")
+
+        def add(path, data, mtime):
+            info = tarfile.TarInfo(f"{root}/{path}")
+            info.size = len(data)
+            info.mtime = mtime
+            archive.addfile(info, io.BytesIO(data))
+
+    now = time.time()
+    for name, config_text in client.iter_node_configs(names, workers=workers):
+        if config_text is None:
+            missing.append(name)
+            continue
+        backup_time = parse_backup_time(client.get_node(name))
+        add(name.replace("/", "_"), config_text.encode("utf-8"), backup_time.timestamp() if backup_time else now)
+        # The compressor holds back small writes, so there is not always output yet
+        data = buffer.drain()
+        if data:
+            yield data
+
+    if missing:
+        add("MISSING.txt", "\n".join(missing).encode("utf-8") + b"\n", now)
+    archive.close()
+    yield buffer.drain()
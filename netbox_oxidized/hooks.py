@@ -0,0 +1,143 @@
+"""Receiver for Oxidized HTTP hook events."""
+
+import base64
+import hmac
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from .client import AGE_INDEX_CACHE_KEY, CONFIG_CACHE_PREFIX, CONFIG_CHANGES_CACHE_KEY, NODES_CACHE_KEY
+from .limiter import PRIORITY_BACKGROUND, cache_lock
+from .utils import update_age_index
+
+logger = logging.getLogger(__name__)
+
+HOOK_EVENTS = ("node_success", "post_store")
+HOOK_LOCK_CACHE_KEY = "netbox_oxidized_hook_lock"
+# Seconds to wait for another hook to finish updating shared entries
+HOOK_LOCK_TIMEOUT = 5
+# Changed nodes remembered for bringing cached search results up to date
+CHANGE_LOG_SIZE = 5000
+
+
+def get_request_token(request) -> str:
+    """Get the hook token sent with a request.
+
+    Accepts ``Authorization: Bearer <token>``, HTTP basic auth with the token
+    as password (as sent by Oxidized's http hook ``username``/``password``
+    options), or an ``X-Hook-Token`` header.
+    """
+    header = request.headers.get("Authorization", "")
+    scheme, _, value = header.partition(" ")
+    if scheme.lower() == "bearer":
+        return value.strip()
+    if scheme.lower() == "basic":
+        try:
+            return base64.b64decode(value).decode().partition(":")[2]
+        except (ValueError, UnicodeDecodeError):
+            return ""
+    return request.headers.get("X-Hook-Token", "")
+
+
+def check_token(request, token: str) -> bool:
+    """Check a request's hook token against the configured one in constant time."""
+    return hmac.compare_digest(get_request_token(request).encode(), token.encode())
+
+
+def get_node_name(payload: dict) -> str:
+    """Get the node name from a hook payload (``node`` as a name or an object with ``name``)."""
+    node = payload.get("node")
+    if isinstance(node, dict):
+        node = node.get("name")
+    return str(node or payload.get("node_name") or "")
+
+
+@contextmanager
+def _hook_lock():
+    """Serialize read-modify-write updates of shared cache entries across hook requests."""
+    with cache_lock(HOOK_LOCK_CACHE_KEY, HOOK_LOCK_TIMEOUT, wait=HOOK_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            logger.warning("Oxidized hook lock not acquired; updating without it")
+        yield
+
+
+def _record_config_change(name: str):
+    """Add a node to the config change log, dropping the oldest entries beyond CHANGE_LOG_SIZE."""
+    changes = cache.get(CONFIG_CHANGES_CACHE_KEY) or {"seq": 0, "floor": 0, "nodes": {}}
+    changes["seq"] += 1
+    changes["nodes"].pop(name, None)
+    changes["nodes"][name] = changes["seq"]
+    if len(changes["nodes"]) > CHANGE_LOG_SIZE:
+        oldest = next(iter(changes["nodes"]))
+        changes["floor"] = changes["nodes"].pop(oldest)
+    cache.set(CONFIG_CHANGES_CACHE_KEY, changes, None)
+
+
+def _mark_backed_up(client, name: str) -> bool:
+    """Mark a node as successfully backed up now in the cached node list and age index.
+
+    Returns:
+        False if the node is not in the cached list; the list is then dropped
+        so the next lookup fetches it, including the new node, from Oxidized.
+    """
+    cached = cache.get_many([NODES_CACHE_KEY, AGE_INDEX_CACHE_KEY])
+    nodes = cached.get(NODES_CACHE_KEY)
+    if nodes is None:
+        return False
+
+    node = next((n for n in nodes if name in (n.get("name"), n.get("full_name"))), None)
+    if node is None:
+        cache.delete_many([NODES_CACHE_KEY, AGE_INDEX_CACHE_KEY])
+        return False
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    last = node.get("last") if isinstance(node.get("last"), dict) else {}
+    node.update({"status": "success", "time": now, "last": {**last, "end": now, "status": "success"}})
+
+    updates = {NODES_CACHE_KEY: nodes}
+    index = cached.get(AGE_INDEX_CACHE_KEY)
+    if index is not None:
+        update_age_index(index, node)
+        updates[AGE_INDEX_CACHE_KEY] = index
+    cache.set_many(updates, client.cache_timeout)
+    return True
+
+
+def handle_hook(client, payload: dict) -> dict:
+    """Apply an Oxidized hook event to the cached data for the affected node.
+
+    ``post_store`` (a changed config was stored) refetches the node's config
+    into the cache in the background lane, so the next device tab view does
+    not pay for the fetch, and logs the change, so cached search results
+    recount just this node. With the git backend configs are read from the
+    repository, so nothing is fetched. ``node_success`` (a backup finished) marks the node's entry in the
+    cached node list as backed up now and moves it in the age index.
+
+    Args:
+        client: OxidizedClient whose cache timeout is used.
+        payload: Decoded JSON body of the hook request.
+
+    Returns:
+        Dict describing what was done, returned to Oxidized as the response.
+    """
+    event = payload.get("event", "")
+    name = get_node_name(payload)
+    if event not in HOOK_EVENTS or not name:
+        return {"status": "ignored", "event": event}
+
+    if event == "post_store":
+        # Fetched before taking the lock, so a slow Oxidized does not hold up other hooks
+        refreshed = not client.git and client.refresh_node_config(name, priority=PRIORITY_BACKGROUND)
+        with _hook_lock():
+            if not refreshed:
+                cache.delete(f"{CONFIG_CACHE_PREFIX}{name}")
+            _record_config_change(name)
+        updated = True
+    else:
+        with _hook_lock():
+            updated = _mark_backed_up(client, name)
+
+    logger.info(f"Oxidized hook {event} for {name}")
+    return {"status": "ok", "event": event, "node": name, "updated": updated}
@@ -0,0 +1,109 @@
+"""Background jobs for NetBox Oxidized plugin."""
+
+import logging
+
+from django.core.cache import cache
+from netbox.jobs import JobRunner
+
+from .client import get_client
+from .limiter import PRIORITY_BACKGROUND
+from .mapping import MAPPING_PENDING_CACHE_KEY, get_mapped_node_names, sync_node_mapping
+
+logger = logging.getLogger(__name__)
+
+# Device fields a drift report can group by, keyed by the form value
+DRIFT_GROUP_FILTERS = {
+    "role": "role__slug",
+    "device_type": "device_type__slug",
+}
+
+
+def get_group_node_names(client, group_by: str, group_value: str) -> list[str]:
+    """Get Oxidized node names for NetBox devices in a role or device type."""
+    # Loading the node list brings the node to device mapping up to date
+    client._get_all_nodes()
+    return sorted(get_mapped_node_names(**{DRIFT_GROUP_FILTERS[group_by]: group_value}))
+
+
+class DriftReportJob(JobRunner):
+    """Compare every device in a role or device type against a golden config or the group medoid."""
+
+    class Meta:
+        name = "Oxidized Drift Report"
+
+    def run(self, group_by, group_value, golden="", threshold=0.1, *args, **kwargs):
+        from .drift import build_drift_report
+
+        params = {"group_by": group_by, "group_value": group_value, "golden": golden, "threshold": threshold}
+        # Keep the parameters on the running job, so the drift view does not enqueue a duplicate
+        self.job.data = params
+        self.job.save(update_fields=["data"])
+
+        client = get_client(priority=PRIORITY_BACKGROUND)
+        if not client:
+            raise RuntimeError("Oxidized plugin not configured.")
+
+        names = get_group_node_names(client, group_by, group_value)
+        logger.info(f"Building drift report for {group_by}={group_value} ({len(names)} nodes)")
+
+        report = build_drift_report(client, names, golden=golden, threshold=threshold)
+        report.update(
+            {
+                "group_by": group_by,
+                "group_value": group_value,
+                "golden": golden,
+            }
+        )
+        self.job.data = report
+
+
+class CacheWarmupJob(JobRunner):
+    """Prefetch nodes.json and node configs from Oxidized into the cache."""
+
+    class Meta:
+        name = "Oxidized Cache Warm-up"
+
+    def run(self, roles=None, manufacturers=None, workers=4, rate=5.0, restart=False, *args, **kwargs):
+        from .warmup import get_warmup_node_names, refresh_node_list, warm_cache
+
+        client = get_client(priority=PRIORITY_BACKGROUND)
+        if not client:
+            raise RuntimeError("Oxidized plugin not configured.")
+
+        node_count = refresh_node_list(client)
+        names = get_warmup_node_names(client, roles, manufacturers)
+        logger.info(f"Warming config cache for {len(names)} of {node_count} nodes")
+
+        def progress(done, total, failed):
+            logger.info(f"Warmed {done}/{total} configs ({failed} failed)")
+
+        result = warm_cache(client, names, workers=workers, rate=rate, restart=restart, progress=progress)
+        result["node_count"] = node_count
+        self.job.data = result
+
+
+class NodeMappingJob(JobRunner):
+    """Rebuild the Oxidized node to NetBox device mapping outside of web requests."""
+
+    class Meta:
+        name = "Oxidized Node Mapping"
+
+    def run(self, *args, **kwargs):
+        from .models import OxidizedNode
+
+        try:
+            client = get_client(priority=PRIORITY_BACKGROUND)
+            if not client:
+                raise RuntimeError("Oxidized plugin not configured.")
+
+            # Loading the node list as a background client rebuilds a stale mapping;
+            # the explicit call covers a node list that was already memoized
+            nodes = client._get_all_nodes()
+            sync_node_mapping(nodes)
+        finally:
+            cache.delete(MAPPING_PENDING_CACHE_KEY)
+
+        self.job.data = {
+            "node_count": len(nodes),
+            "mapped_count": OxidizedNode.objects.filter(device__isnull=False).count(),
+        }
@@ -0,0 +1,147 @@
+"""Concurrency and rate limiting of Oxidized requests, coordinated through the shared cache."""
+
+import logging
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, highest first
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK, PRIORITY_BACKGROUND)
+
+# Share of the concurrency slots each lane may hold. Lower lanes can only take
+# the first slots, so the rest stay free for higher lanes.
+LANE_SHARES = {
+    PRIORITY_INTERACTIVE: 1.0,
+    PRIORITY_BULK: 0.75,
+    PRIORITY_BACKGROUND: 0.5,
+}
+
+SLOT_CACHE_PREFIX = "netbox_oxidized_slot_"
+RATE_CACHE_PREFIX = "netbox_oxidized_rate_"
+# Delay between attempts to get a slot, in seconds
+POLL_INTERVAL = 0.05
+
+
+def release_lock(key: str, token: str):
+    """Delete a lock key, but only while it still holds this holder's token.
+
+    A holder that ran past the lock's timeout must not delete a lock that
+    another holder has taken since.
+    """
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+@contextmanager
+def cache_lock(key: str, timeout: float, wait: float = 0):
+    """Hold a lock shared by all workers and hosts for the duration of the block.
+
+    The lock is a cache key claimed with cache.add() under a token unique to
+    this holder. It expires after `timeout` seconds, so a crashed worker
+    cannot hold it forever, and is released with release_lock().
+
+    Args:
+        key: Cache key of the lock.
+        timeout: Seconds until the lock expires.
+        wait: Seconds to keep trying while another holder has the lock.
+
+    Yields:
+        True if the lock was acquired.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    acquired = cache.add(key, token, math.ceil(timeout))
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL * (1 + random.random()))
+        acquired = cache.add(key, token, math.ceil(timeout))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lock(key, token)
+
+
+def lower_priority(a: str, b: str) -> str:
+    """Return the lower of two priority lanes."""
+    return max(a, b, key=PRIORITIES.index)
+
+
+class OxidizedRequestLimiter:
+    """Limit concurrent and per-second requests to Oxidized across all workers and hosts.
+
+    Concurrency slots are cache keys claimed with cache.add(), which is atomic
+    on shared backends such as Redis, and expire after the request timeout so
+    a crashed worker cannot hold one forever. The request rate is counted per
+    wall-clock second with cache.incr(). With a per-process cache backend
+    (e.g. LocMemCache) the limits apply per process only.
+    """
+
+    def __init__(self, max_concurrent: int = 0, max_per_second: int = 0, timeout: float = 30):
+        self.max_concurrent = max_concurrent
+        self.max_per_second = max_per_second
+        self.timeout = timeout
+
+    def _lane_slots(self, priority: str) -> int:
+        return max(1, math.ceil(self.max_concurrent * LANE_SHARES.get(priority, 1.0)))
+
+    def _take_slot(self, priority: str, token: str):
+        for i in range(self._lane_slots(priority)):
+            key = f"{SLOT_CACHE_PREFIX}{i}"
+            if cache.add(key, token, math.ceil(self.timeout) + 5):
+                return key
+        return None
+
+    def _take_rate(self) -> bool:
+        key = f"{RATE_CACHE_PREFIX}{int(time.time())}"
+        cache.add(key, 0, 2)
+        try:
+            return cache.incr(key) <= self.max_per_second
+        except ValueError:
+            # Counter expired between add() and incr()
+            return False
+
+    @contextmanager
+    def slot(self, priority: str = PRIORITY_INTERACTIVE):
+        """Hold a request slot in a priority lane for the duration of the block.
+
+        Yields:
+            True if a slot was acquired, False if none became free within the timeout.
+        """
+        if not self.max_concurrent and not self.max_per_second:
+            yield True
+            return
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.timeout
+        key = None
+        acquired = False
+
+        while True:
+            if self.max_concurrent and key is None:
+                key = self._take_slot(priority, token)
+            if key is not None or not self.max_concurrent:
+                if not self.max_per_second or self._take_rate():
+                    acquired = True
+                    break
+            if time.monotonic() >= deadline:
+                break
+            # Jitter keeps waiting workers from polling in lockstep
+            time.sleep(POLL_INTERVAL * (1 + random.random()))
+
+        if not acquired:
+            logger.warning(f"No Oxidized request slot free in the {priority} lane after {self.timeout}s")
+
+        try:
+            yield acquired
+        finally:
+            if key is not None:
+                release_lock(key, token)
@@ -0,0 +1,55 @@
+"""Export Oxidized node configs to a tar.gz or zip archive."""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_oxidized.client import get_client
+from netbox_oxidized.export import EXPORT_FORMATS, get_export_filename, get_export_node_names, stream_archive
+from netbox_oxidized.limiter import PRIORITY_BACKGROUND
+
+
+class Command(BaseCommand):
+    help = "Export node configs from Oxidized as an archive, optionally filtered by NetBox device attributes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--role", action="append", dest="roles", default=[], metavar="SLUG")
+        parser.add_argument("--site", action="append", dest="sites", default=[], metavar="SLUG")
+        parser.add_argument("--manufacturer", action="append", dest="manufacturers", default=[], metavar="SLUG")
+        parser.add_argument("--tag", action="append", dest="tags", default=[], metavar="SLUG")
+        parser.add_argument("--query", default="", help="Only export configs containing this text")
+        parser.add_argument("--section", default="", help="With --query, only match within this config section")
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="tar.gz")
+        parser.add_argument("--output", "-o", help="Output file, or - for stdout (default: generated name)")
+        parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent requests to Oxidized")
+
+    def handle(self, *args, **options):
+        client = get_client(priority=PRIORITY_BACKGROUND)
+        if not client:
+            raise CommandError("Oxidized plugin not configured (oxidized_url is not set).")
+
+        names = get_export_node_names(
+            client,
+            roles=options["roles"],
+            sites=options["sites"],
+            manufacturers=options["manufacturers"],
+            tags=options["tags"],
+            query=options["query"],
+            section=options["section"],
+        )
+        if not names:
+            raise CommandError("No Oxidized nodes match the selected filters.")
+
+        output = options["output"] or get_export_filename(options["format"])
+        archive = stream_archive(client, names, options["format"], workers=options["workers"])
+
+        if output == "-":
+            for chunk in archive:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(output, "wb") as f:
+            for chunk in archive:
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {len(names)} nodes to {output}"))
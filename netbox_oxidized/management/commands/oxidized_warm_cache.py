@@ -0,0 +1,97 @@
+"""Prefetch Oxidized nodes and configs into the cache."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_oxidized.client import get_client
+from netbox_oxidized.limiter import PRIORITY_BACKGROUND
+from netbox_oxidized.warmup import get_warmup_node_names, refresh_node_list, warm_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Prefetch nodes.json and node configs from Oxidized into the cache. "
+        "By default only devices matching the device_roles and manufacturers plugin settings are warmed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent requests to Oxidized")
+        parser.add_argument(
+            "--rate", type=float, default=5.0, help="Maximum requests per second to Oxidized (0 = unlimited)"
+        )
+        parser.add_argument(
+            "--role", action="append", dest="roles", metavar="SLUG", help="Limit to a device role (repeatable)"
+        )
+        parser.add_argument(
+            "--manufacturer",
+            action="append",
+            dest="manufacturers",
+            metavar="SLUG",
+            help="Limit to a manufacturer (repeatable)",
+        )
+        parser.add_argument(
+            "--all-devices", action="store_true", help="Ignore the device_roles and manufacturers plugin settings"
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Fetch every config again instead of resuming an interrupted run"
+        )
+        parser.add_argument("--enqueue", action="store_true", help="Run as a background job instead of in this process")
+        parser.add_argument(
+            "--interval", type=int, metavar="MINUTES", help="With --enqueue, repeat the job every MINUTES"
+        )
+
+    def handle(self, *args, **options):
+        roles = options["roles"]
+        manufacturers = options["manufacturers"]
+        if options["all_devices"]:
+            roles = roles or []
+            manufacturers = manufacturers or []
+
+        job_kwargs = {
+            "roles": roles,
+            "manufacturers": manufacturers,
+            "workers": options["workers"],
+            "rate": options["rate"],
+            "restart": options["restart"],
+        }
+
+        if options["enqueue"]:
+            from netbox_oxidized.jobs import CacheWarmupJob
+
+            if options["interval"]:
+                job = CacheWarmupJob.enqueue_once(interval=options["interval"], **job_kwargs)
+            else:
+                job = CacheWarmupJob.enqueue(**job_kwargs)
+            self.stdout.write(self.style.SUCCESS(f"Enqueued job #{job.pk}"))
+            return
+
+        client = get_client(priority=PRIORITY_BACKGROUND)
+        if not client:
+            raise CommandError("Oxidized plugin not configured (oxidized_url is not set).")
+
+        node_count = refresh_node_list(client)
+        if not node_count:
+            raise CommandError("No nodes returned by Oxidized.")
+        self.stdout.write(f"Cached nodes.json ({node_count} nodes)")
+
+        names = get_warmup_node_names(client, roles, manufacturers)
+        if client.git:
+            self.stdout.write("Configs are read from the git repository; nothing to warm.")
+            return
+
+        def progress(done, total, failed):
+            self.stdout.write(f"  {done}/{total} configs fetched ({failed} failed)")
+
+        self.stdout.write(f"Warming {len(names)} configs with {options['workers']} workers at {options['rate']}/s")
+        result = warm_cache(
+            client,
+            names,
+            workers=options["workers"],
+            rate=options["rate"],
+            restart=options["restart"],
+            progress=progress,
+        )
+
+        if result["skipped"]:
+            self.stdout.write(f"Skipped {result['skipped']} configs warmed by a previous run")
+        style = self.style.WARNING if result["failed"] else self.style.SUCCESS
+        self.stdout.write(style(f"Fetched {result['fetched']} configs, {result['failed']} failed"))
@@ -0,0 +1,265 @@
+"""Mapping between Oxidized nodes and NetBox devices."""
+
+import logging
+from collections import Counter
+from typing import Optional
+
+from dcim.models import Device, DeviceRole, DeviceType
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .limiter import cache_lock
+from .models import OxidizedNode
+from .store import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Hash of the node list the mapping was last built from
+MAPPING_HASH_CACHE_KEY = "netbox_oxidized_mapping_hash"
+# Rebuild the mapping at least this often (seconds), even if the node list is unchanged
+MAPPING_REFRESH_INTERVAL = 86400
+# Held while a rebuild runs, so only one worker rebuilds at a time
+MAPPING_LOCK_CACHE_KEY = "netbox_oxidized_mapping_lock"
+# Set while a background rebuild is queued, so it is only enqueued once
+MAPPING_PENDING_CACHE_KEY = "netbox_oxidized_mapping_pending"
+# Longest a rebuild may hold the lock, or stay queued, in seconds
+MAPPING_LOCK_TIMEOUT = 600
+# After a failed rebuild, wait this long (seconds) before trying the same node list again
+MAPPING_RETRY_INTERVAL = 900
+TAB_FILTER_CACHE_KEY = "netbox_oxidized_tab_filter"
+
+
+def _host(address) -> str:
+    """Strip the prefix length from an IP address."""
+    return str(address).split("/")[0]
+
+
+def _unique_nodes(nodes: list) -> list:
+    """Drop nodes whose name repeats an earlier node's.
+
+    Oxidized allows the same name in different groups, but the mapping is
+    keyed on the name, so only the first node with each name is kept (the
+    same one get_node() resolves the name to).
+    """
+    seen = set()
+    unique = []
+    for node in nodes:
+        if node["name"] not in seen:
+            seen.add(node["name"])
+            unique.append(node)
+    if len(unique) < len(nodes):
+        logger.warning(f"Skipped {len(nodes) - len(unique)} Oxidized nodes whose name is used in another group")
+    return unique
+
+
+def _match_devices(nodes: list) -> dict[str, tuple[Optional[int], str]]:
+    """Match nodes to devices by name, then full name, then primary IP.
+
+    Names shared by several devices (e.g. at different sites) are ambiguous
+    and only matched by IP.
+
+    Returns:
+        Dict mapping node name to (device ID or None, match method).
+    """
+    names = {node["name"] for node in nodes}
+    full_names = {node["full_name"] for node in nodes if node.get("full_name")}
+
+    devices = list(Device.objects.filter(name__in=names | full_names).values_list("name", "pk"))
+    counts = Counter(name for name, _ in devices)
+    by_name = {name: pk for name, pk in devices if counts[name] == 1}
+
+    matches = {}
+    unmatched = []
+    for node in nodes:
+        if node["name"] in by_name:
+            matches[node["name"]] = (by_name[node["name"]], OxidizedNode.MATCH_NAME)
+        elif node.get("full_name") in by_name:
+            matches[node["name"]] = (by_name[node["full_name"]], OxidizedNode.MATCH_FULL_NAME)
+        else:
+            matches[node["name"]] = (None, "")
+            if node.get("ip"):
+                unmatched.append(node)
+
+    if unmatched:
+        by_ip = {}
+        devices = Device.objects.filter(Q(primary_ip4__isnull=False) | Q(primary_ip6__isnull=False)).values_list(
+            "pk", "primary_ip4__address", "primary_ip6__address"
+        )
+        for pk, ip4, ip6 in devices:
+            for address in (ip4, ip6):
+                if address:
+                    by_ip.setdefault(_host(address), pk)
+        for node in unmatched:
+            pk = by_ip.get(_host(node["ip"]))
+            if pk:
+                matches[node["name"]] = (pk, OxidizedNode.MATCH_IP)
+
+    return matches
+
+
+def get_node_list_hash(nodes: list) -> str:
+    """Hash the node fields the mapping is built from."""
+    return content_hash(
+        "\n".join(sorted(f"{n['name']}|{n.get('full_name') or ''}|{n.get('ip') or ''}" for n in nodes if n.get("name")))
+    )
+
+
+def is_mapping_current(nodes: list, check_hash: bool = True) -> bool:
+    """Check whether the mapping was built from this node list.
+
+    Args:
+        nodes: Node entries from /nodes.json.
+        check_hash: Compare the node list's hash; if False, only check that
+            the mapping has not been invalidated (e.g. by a device change).
+    """
+    current = cache.get(MAPPING_HASH_CACHE_KEY)
+    if current is None:
+        return False
+    return not check_hash or current == get_node_list_hash(nodes)
+
+
+def schedule_node_mapping():
+    """Enqueue a background rebuild of the mapping unless one is already queued."""
+    from .jobs import NodeMappingJob
+
+    if not cache.add(MAPPING_PENDING_CACHE_KEY, True, MAPPING_LOCK_TIMEOUT):
+        return
+    try:
+        NodeMappingJob.enqueue()
+    except Exception:
+        cache.delete(MAPPING_PENDING_CACHE_KEY)
+        raise
+
+
+def _write_mapping(nodes: list) -> int:
+    """Match nodes to devices and upsert the mapping in bulk, removing nodes no longer listed.
+
+    Returns:
+        Number of nodes matched to a device.
+    """
+    matches = _match_devices(nodes)
+    rows = [
+        OxidizedNode(
+            name=node["name"],
+            full_name=node.get("full_name") or "",
+            ip=_host(node.get("ip") or ""),
+            device_id=matches[node["name"]][0],
+            match_method=matches[node["name"]][1],
+        )
+        for node in nodes
+    ]
+
+    with transaction.atomic():
+        OxidizedNode.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["full_name", "ip", "device", "match_method", "last_updated"],
+        )
+        OxidizedNode.objects.exclude(name__in=[row.name for row in rows]).delete()
+
+    return sum(1 for pk, _ in matches.values() if pk)
+
+
+def sync_node_mapping(nodes: list, force: bool = False) -> bool:
+    """Rebuild the node to device mapping if the node list has changed.
+
+    Nodes are upserted and removed in bulk. The hash of the node list is
+    cached, so calling this with an unchanged list costs one cache read;
+    saving or deleting a device clears the hash so the next call rebuilds.
+    Only one worker rebuilds at a time; others skip the rebuild and keep
+    using the existing mapping.
+
+    Args:
+        nodes: Node entries from /nodes.json.
+        force: Rebuild even if the node list is unchanged.
+
+    Returns:
+        True if the mapping was rebuilt.
+    """
+    nodes = [node for node in nodes if node.get("name")]
+    digest = get_node_list_hash(nodes)
+    if not force and cache.get(MAPPING_HASH_CACHE_KEY) == digest:
+        return False
+
+    with cache_lock(MAPPING_LOCK_CACHE_KEY, MAPPING_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            logger.debug("Oxidized node mapping is already being rebuilt")
+            return False
+
+        nodes = _unique_nodes(nodes)
+        try:
+            matched = _write_mapping(nodes)
+        except Exception:
+            # Record the node list anyway, so a failing rebuild is not retried on every request
+            cache.set(MAPPING_HASH_CACHE_KEY, digest, MAPPING_RETRY_INTERVAL)
+            raise
+        cache.set(MAPPING_HASH_CACHE_KEY, digest, MAPPING_REFRESH_INTERVAL)
+
+    logger.info(f"Mapped {matched} of {len(nodes)} Oxidized nodes to NetBox devices")
+    return True
+
+
+def get_node_name(device) -> str:
+    """Get the Oxidized node name for a device, falling back to the device name."""
+    name = OxidizedNode.objects.filter(device=device).values_list("name", flat=True).first()
+    return name or device.name
+
+
+def get_device_ids(names) -> dict[str, int]:
+    """Get the IDs of the NetBox devices mapped to Oxidized nodes, in one query.
+
+    Args:
+        names: Node names.
+
+    Returns:
+        Dict mapping node name to device ID, for mapped nodes only.
+    """
+    return dict(OxidizedNode.objects.filter(name__in=names, device__isnull=False).values_list("name", "device_id"))
+
+
+def get_mapped_node_names(**device_filters) -> list[str]:
+    """Get names of Oxidized nodes whose device matches the given filters.
+
+    Args:
+        device_filters: Device queryset filters, e.g. role__slug__in=["core"].
+    """
+    filters = {f"device__{key}": value for key, value in device_filters.items()}
+    return list(OxidizedNode.objects.filter(device__isnull=False, **filters).values_list("name", flat=True))
+
+
+def get_tab_filter() -> tuple[Optional[set], Optional[set]]:
+    """Get the device role IDs and device type IDs the Oxidized tab is shown for.
+
+    Resolved from the device_roles and manufacturers settings once and cached
+    until a role, device type or manufacturer changes, so the tab check only
+    compares a device's role_id and device_type_id.
+
+    Returns:
+        Tuple of (role IDs, device type IDs); None means no filter.
+    """
+    config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
+    device_roles = sorted(config.get("device_roles", []))
+    manufacturers = sorted(config.get("manufacturers", []))
+    if not device_roles and not manufacturers:
+        return None, None
+
+    # Settings can change on restart, so the cached entry records what it was resolved from
+    settings_key = [device_roles, manufacturers]
+    cached = cache.get(TAB_FILTER_CACHE_KEY)
+    if cached is not None and cached[0] == settings_key:
+        return cached[1], cached[2]
+
+    role_ids = None
+    device_type_ids = None
+    if device_roles:
+        role_ids = set(DeviceRole.objects.filter(slug__in=device_roles).values_list("pk", flat=True))
+    if manufacturers:
+        device_type_ids = set(
+            DeviceType.objects.filter(manufacturer__slug__in=manufacturers).values_list("pk", flat=True)
+        )
+    cache.set(TAB_FILTER_CACHE_KEY, (settings_key, role_ids, device_type_ids), None)
+    return role_ids, device_type_ids
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("dcim", "0191_module_bay_rebuild"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OxidizedNode",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("full_name", models.CharField(blank=True, max_length=255)),
+                ("ip", models.CharField(blank=True, max_length=64)),
+                (
+                    "match_method",
+                    models.CharField(
+                        blank=True,
+                        choices=[("name", "Name"), ("full_name", "Full name"), ("ip", "Primary IP")],
+                        max_length=16,
+                    ),
+                ),
+                ("last_updated", models.DateTimeField(auto_now=True)),
+                (
+                    "device",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="oxidized_nodes",
+                        to="dcim.device",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Oxidized node",
+                "ordering": ("name",),
+            },
+        ),
+    ]
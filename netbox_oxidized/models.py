@@ -0,0 +1,40 @@
+"""Models for NetBox Oxidized plugin."""
+
+from django.db import models
+
+
+class OxidizedNode(models.Model):
+    """An Oxidized node and the NetBox device it was matched to.
+
+    Rows are kept in sync with Oxidized's node list by
+    mapping.sync_node_mapping() whenever the list changes.
+    """
+
+    MATCH_NAME = "name"
+    MATCH_FULL_NAME = "full_name"
+    MATCH_IP = "ip"
+    MATCH_CHOICES = (
+        (MATCH_NAME, "Name"),
+        (MATCH_FULL_NAME, "Full name"),
+        (MATCH_IP, "Primary IP"),
+    )
+
+    name = models.CharField(max_length=255, unique=True)
+    full_name = models.CharField(max_length=255, blank=True)
+    ip = models.CharField(max_length=64, blank=True)
+    device = models.ForeignKey(
+        to="dcim.Device",
+        on_delete=models.SET_NULL,
+        related_name="oxidized_nodes",
+        blank=True,
+        null=True,
+    )
+    match_method = models.CharField(max_length=16, choices=MATCH_CHOICES, blank=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name = "Oxidized node"
+
+    def __str__(self):
+        return self.name
@@ -23,6 +23,21 @@ menu = PluginMenu(
                     link_text="Config Audit",
                     permissions=["dcim.view_device"],
                 ),
+                PluginMenuItem(
+                    link="plugins:netbox_oxidized:config_drift",
+                    link_text="Config Drift",
+                    permissions=["dcim.view_device"],
+                ),
+                PluginMenuItem(
+                    link="plugins:netbox_oxidized:config_export",
+                    link_text="Config Export",
+                    permissions=["dcim.view_device"],
+                ),
+                PluginMenuItem(
+                    link="plugins:netbox_oxidized:backup_status_list",
+                    link_text="Backup Status",
+                    permissions=["dcim.view_device"],
+                ),
             ),
         ),
         (
@@ -0,0 +1,184 @@
+"""Indentation-based parsing of device configs into sections and blocks."""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional, Sequence
+
+# Top-level commands whose section is named by their first two words
+# (e.g. "router bgp", "ip access-list", "line vty") rather than the first.
+MULTIWORD_SECTIONS = {"ip", "ipv6", "router", "line", "crypto", "vrf", "no", "snmp-server", "logging", "aaa"}
+
+# Parsed configs kept per process, keyed by config content hash, up to this many lines in total
+PARSED_CACHE_LINES = 250000
+
+_parsed = OrderedDict()
+_parsed_lines = 0
+_parsed_lock = threading.Lock()
+
+
+def section_key(line: str) -> str:
+    """Get the section name for a top-level config line."""
+    words = line.split()
+    if not words:
+        return ""
+    if len(words) > 1 and words[0] in MULTIWORD_SECTIONS:
+        return f"{words[0]} {words[1]}"
+    return words[0]
+
+
+class ParsedConfig:
+    """Block tree of a config, built from line indentation.
+
+    Each line records the index of its parent line (-1 at top level), and
+    each top-level block is indexed by section name as a range of line
+    indexes covering the block and all of its children. Blank lines and
+    ``!`` comments have no parent; a ``!`` at column 0 closes the current
+    top-level block.
+    """
+
+    __slots__ = ("lines", "parents", "sections")
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.parents = array("i", [-1]) * len(lines)
+        self.sections = {}
+
+        stack = []
+        block_start = None
+        block_key = None
+
+        def close_block(end):
+            if block_start is not None:
+                self.sections.setdefault(block_key, []).append((block_start, end))
+
+        for i, line in enumerate(lines):
+            stripped = line.lstrip()
+            if not stripped:
+                continue
+            indent = len(line) - len(stripped)
+
+            if stripped.startswith("!"):
+                if indent == 0:
+                    close_block(i)
+                    block_start = None
+                    stack = []
+                continue
+
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            if stack:
+                self.parents[i] = stack[-1][1]
+            stack.append((indent, i))
+
+            if indent == 0:
+                close_block(i)
+                block_start, block_key = i, section_key(stripped)
+
+        close_block(len(lines))
+
+    def ranges(self, section: Optional[str] = None) -> list[tuple[int, int]]:
+        """Line index ranges for a section, or the whole config if section is empty.
+
+        A one-word section also covers the two-word sections it starts, so
+        "aaa" matches "aaa new-model" and "aaa authentication" blocks.
+        """
+        if not section:
+            return [(0, len(self.lines))]
+        ranges = self.sections.get(section, [])
+        # Section keys have at most two words, so only a one-word section can prefix another
+        if " " in section:
+            return ranges
+        prefix = section + " "
+        prefixed = [r for key, key_ranges in self.sections.items() if key.startswith(prefix) for r in key_ranges]
+        if not prefixed:
+            return ranges
+        return sorted(ranges + prefixed)
+
+    def find(self, needle: str, section: Optional[str] = None) -> Iterator[int]:
+        """Yield indexes of lines containing a lowercase needle, optionally within a section."""
+        lines = self.lines
+        for start, end in self.ranges(section):
+            for i in range(start, end):
+                if needle in lines[i].lower():
+                    yield i
+
+    def count(self, needle: str, section: Optional[str] = None) -> int:
+        """Count lines containing a lowercase needle, optionally within a section."""
+        return sum(1 for _ in self.find(needle, section))
+
+    def parent(self, index: int) -> str:
+        """Get the text of a line's parent line, or an empty string at top level."""
+        parent = self.parents[index]
+        return self.lines[parent] if parent >= 0 else ""
+
+    def section_lines(self, section: str) -> list[str]:
+        """Get all lines of a section's blocks, in config order."""
+        return [line for start, end in self.ranges(section) for line in self.lines[start:end]]
+
+
+def parent_line(lines: Sequence[str], index: int) -> str:
+    """Get the text of a line's parent line without parsing the whole config.
+
+    Walks back to the nearest line indented less than the given one, with the
+    same rules as ParsedConfig: blank lines and ``!`` comments are skipped, and
+    a ``!`` at column 0 ends the block.
+    """
+    line = lines[index]
+    indent = len(line) - len(line.lstrip())
+    if not indent:
+        return ""
+    for i in range(index - 1, -1, -1):
+        stripped = lines[i].lstrip()
+        if not stripped:
+            continue
+        line_indent = len(lines[i]) - len(stripped)
+        if stripped.startswith("!"):
+            if not line_indent:
+                return ""
+            continue
+        if line_indent < indent:
+            return lines[i]
+    return ""
+
+
+def get_cached_parsed(digest: str) -> Optional[ParsedConfig]:
+    """Get the parsed form of a config if it is already cached, without parsing it."""
+    with _parsed_lock:
+        return _parsed.get(digest)
+
+
+def get_parsed(digest: str, get_lines: Callable[[], Sequence[str]], evict: bool = True) -> ParsedConfig:
+    """Get the parsed form of a config, parsing it only once per content hash while cached.
+
+    The cache holds up to PARSED_CACHE_LINES lines in total, least recently
+    used configs first out.
+
+    Args:
+        digest: Content hash of the config.
+        get_lines: Returns the config's lines; only called on a cache miss.
+        evict: Make room by evicting other configs. Bulk scans pass False, so
+            a pass over the whole fleet only fills free space instead of
+            pushing out every config parsed before it.
+    """
+    global _parsed_lines
+
+    with _parsed_lock:
+        parsed = _parsed.get(digest)
+        if parsed is not None:
+            _parsed.move_to_end(digest)
+            return parsed
+
+    parsed = ParsedConfig(get_lines())
+    size = len(parsed.lines)
+    with _parsed_lock:
+        if digest in _parsed or size > PARSED_CACHE_LINES:
+            return parsed
+        if not evict and _parsed_lines + size > PARSED_CACHE_LINES:
+            return parsed
+        _parsed[digest] = parsed
+        _parsed_lines += size
+        while _parsed_lines > PARSED_CACHE_LINES:
+            _, evicted = _parsed.popitem(last=False)
+            _parsed_lines -= len(evicted.lines)
+    return parsed
@@ -0,0 +1,26 @@
+"""Signal handlers keeping precomputed device data in step with NetBox."""
+
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .mapping import MAPPING_HASH_CACHE_KEY, TAB_FILTER_CACHE_KEY
+
+
+@receiver((post_save, post_delete), sender=Device)
+def invalidate_node_mapping(sender, **kwargs):
+    """Mark the node mapping stale, e.g. after a device is added or renamed.
+
+    The next node list load queues a background rebuild; pages keep using
+    the existing mapping until it has run.
+    """
+    cache.delete(MAPPING_HASH_CACHE_KEY)
+
+
+@receiver((post_save, post_delete), sender=DeviceRole)
+@receiver((post_save, post_delete), sender=DeviceType)
+@receiver((post_save, post_delete), sender=Manufacturer)
+def invalidate_tab_filter(sender, **kwargs):
+    """Resolve the tab filter's role and device type IDs again."""
+    cache.delete(TAB_FILTER_CACHE_KEY)
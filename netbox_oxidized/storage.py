@@ -0,0 +1,198 @@
+"""Local git repository backend for reading Oxidized backups."""
+
+import logging
+import stat
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_backends = {}
+# Paths that failed to open, with the time of the failure
+_failed = {}
+_backends_lock = threading.Lock()
+# Wait this long (seconds) before trying to open a failed path again
+OPEN_RETRY_INTERVAL = 300
+
+
+class GitRepoBackend:
+    """Read node configs and version history straight from Oxidized's git output.
+
+    Works with bare repositories and working trees. With groups and
+    ``single_repo: true`` Oxidized stores nodes as ``<group>/<name>``,
+    otherwise as ``<name>`` at the root; both layouts are resolved.
+
+    The repository is opened once per process and kept open so pack file
+    handles and indexes are reused between requests. Blob contents are cached
+    by object id, which is content-addressed and therefore never stale, up to
+    a total size in bytes (8 MB by default).
+    Version lists are cached per node with the HEAD they were read at; when
+    HEAD moves, only the commits since then are walked.
+    """
+
+    def __init__(self, path: str, blob_cache_bytes: int = 8 * 1024 * 1024, version_cache_size: int = 4096):
+        from dulwich.repo import Repo
+
+        self.path = path
+        self.repo = Repo(path)
+        self.blob_cache_bytes = blob_cache_bytes
+        self._blobs = OrderedDict()
+        self._blob_bytes = 0
+        self.version_cache_size = version_cache_size
+        self._versions = OrderedDict()
+        self._head = None
+        self._paths = {}
+        # Pack files are read with seek()/read() on shared handles
+        self._lock = threading.Lock()
+
+    def _refresh_index(self):
+        """Rebuild the node name -> (path, blob oid) index when HEAD has moved."""
+        head = self.repo.head()
+        if head == self._head:
+            return
+
+        store = self.repo.object_store
+        paths = {}
+        for entry in store[store[head].tree].iteritems():
+            if stat.S_ISDIR(entry.mode):
+                group = entry.path.decode()
+                for child in store[entry.sha].iteritems():
+                    if stat.S_ISREG(child.mode):
+                        name = child.path.decode()
+                        paths[f"{group}/{name}"] = (f"{group}/{name}", child.sha)
+                        paths.setdefault(name, (f"{group}/{name}", child.sha))
+            elif stat.S_ISREG(entry.mode):
+                name = entry.path.decode()
+                paths[name] = (name, entry.sha)
+
+        self._head = head
+        self._paths = paths
+
+    def _read_blob(self, oid: bytes) -> str:
+        """Return blob contents as text, cached by object id up to blob_cache_bytes in total."""
+        cached = self._blobs.get(oid)
+        if cached is not None:
+            self._blobs.move_to_end(oid)
+            return cached[0]
+
+        data = self.repo.object_store[oid].data
+        text = data.decode("utf-8", errors="replace")
+        if len(data) <= self.blob_cache_bytes:
+            self._blobs[oid] = (text, len(data))
+            self._blob_bytes += len(data)
+            while self._blob_bytes > self.blob_cache_bytes:
+                _, (_, size) = self._blobs.popitem(last=False)
+                self._blob_bytes -= size
+        return text
+
+    def _reopen(self):
+        """Reopen the repository after a read failure (e.g. packs replaced by gc)."""
+        from dulwich.repo import Repo
+
+        self.repo.close()
+        self.repo = Repo(self.path)
+        self._head = None
+        self._versions.clear()
+
+    def get_config(self, name: str) -> Optional[str]:
+        """Get the config for a node at HEAD.
+
+        Args:
+            name: Node name or full name (``group/name``).
+
+        Returns:
+            Config text, or None if the node is not in the repository.
+        """
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    self._refresh_index()
+                    entry = self._paths.get(name)
+                    return self._read_blob(entry[1]) if entry else None
+                except (KeyError, OSError, ValueError) as e:
+                    if attempt:
+                        logger.error(f"Failed to read {name} from git repo {self.path}: {e}")
+                        return None
+                    self._reopen()
+
+    def get_versions(self, name: str, limit: int = 20) -> list[dict]:
+        """Get the most recent commits that changed a node's config.
+
+        Args:
+            name: Node name or full name (``group/name``).
+            limit: Maximum number of versions to return.
+
+        Returns:
+            List of dicts with oid, date, author and message, newest first.
+        """
+        with self._lock:
+            try:
+                self._refresh_index()
+                entry = self._paths.get(name)
+                if not entry:
+                    return []
+                key = (entry[0], limit)
+                cached = self._versions.get(key)
+                if cached is not None and cached[0] == self._head:
+                    self._versions.move_to_end(key)
+                    return list(cached[1])
+
+                # Oxidized only appends commits, so walk back to the HEAD the cached list was read at
+                exclude = [cached[0]] if cached is not None else []
+                walker = self.repo.get_walker(
+                    include=[self._head], exclude=exclude, paths=[entry[0].encode()], max_entries=limit
+                )
+                versions = []
+                for walk_entry in walker:
+                    commit = walk_entry.commit
+                    versions.append(
+                        {
+                            "oid": commit.id.decode(),
+                            "date": datetime.fromtimestamp(commit.commit_time, timezone.utc).strftime(
+                                "%Y-%m-%d %H:%M:%S UTC"
+                            ),
+                            "author": commit.author.decode("utf-8", errors="replace"),
+                            "message": commit.message.decode("utf-8", errors="replace").strip(),
+                        }
+                    )
+                if cached is not None:
+                    versions = (versions + cached[1])[:limit]
+
+                self._versions[key] = (self._head, versions)
+                self._versions.move_to_end(key)
+                if len(self._versions) > self.version_cache_size:
+                    self._versions.popitem(last=False)
+                return list(versions)
+            except (KeyError, OSError, ValueError) as e:
+                logger.error(f"Failed to read history for {name} from git repo {self.path}: {e}")
+                return []
+
+
+def get_git_backend(path: str) -> Optional[GitRepoBackend]:
+    """Get the shared backend for a repository path, or None if it cannot be opened.
+
+    A path that fails to open is not tried again for OPEN_RETRY_INTERVAL
+    seconds, so a missing repository is not reopened and logged on every request.
+    """
+    with _backends_lock:
+        backend = _backends.get(path)
+        if backend is None:
+            failed_at = _failed.get(path)
+            if failed_at is not None and time.monotonic() - failed_at < OPEN_RETRY_INTERVAL:
+                return None
+            try:
+                backend = GitRepoBackend(path)
+            except ImportError:
+                logger.error("dulwich package not installed. Install netbox-oxidized[git] to use git_repo.")
+                _failed[path] = time.monotonic()
+                return None
+            except Exception as e:
+                logger.error(f"Failed to open Oxidized git repo {path}: {e}")
+                _failed[path] = time.monotonic()
+                return None
+            _failed.pop(path, None)
+            _backends[path] = backend
+        return backend
@@ -0,0 +1,112 @@
+"""In-memory config store with content-addressed dedup for bulk operations."""
+
+import hashlib
+from typing import Optional
+
+from .parser import ParsedConfig, get_cached_parsed, get_parsed
+
+
+def content_hash(text: str) -> str:
+    """Return the content hash used to key configs and data derived from them."""
+    return hashlib.sha1(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+class ConfigStore:
+    """Node configs held by a client for the lifetime of a request or job.
+
+    Each distinct config is stored once, keyed by content hash, and nodes map
+    to hashes, so template-built configs that are byte-identical share one
+    string. With ``intern_lines`` enabled configs are kept as tuples of lines
+    drawn from a shared pool instead, so a line repeated across thousands of
+    near-identical configs is held only once; the full text is rebuilt on
+    demand.
+    """
+
+    def __init__(self, intern_lines: bool = False):
+        self.intern_lines = intern_lines
+        self._nodes = {}
+        self._configs = {}
+        self._line_pool = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def put(self, name: str, text: str) -> str:
+        """Store a node's config.
+
+        Returns:
+            The config text to hand out: the shared copy when deduplicating,
+            otherwise the text passed in.
+        """
+        digest = content_hash(text)
+        self._nodes[name] = digest
+
+        if self.intern_lines:
+            if digest not in self._configs:
+                pool = self._line_pool
+                self._configs[digest] = tuple(pool.setdefault(line, line) for line in text.split("\n"))
+            return text
+
+        return self._configs.setdefault(digest, text)
+
+    def get(self, name: str) -> Optional[str]:
+        """Get a node's config text, or None if it is not in the store."""
+        digest = self._nodes.get(name)
+        if digest is None:
+            return None
+        config = self._configs[digest]
+        return "\n".join(config) if self.intern_lines else config
+
+    def digest(self, name: str) -> Optional[str]:
+        """Get the content hash of a node's config, or None if it is not in the store."""
+        return self._nodes.get(name)
+
+    def lines(self, name: str) -> tuple[str, ...]:
+        """Get a node's config as a tuple of lines (empty if not in the store).
+
+        Lines of a config that has already been parsed are taken from the
+        parsed config rather than split from the text again.
+        """
+        digest = self._nodes.get(name)
+        if digest is None:
+            return ()
+        config = self._configs[digest]
+        if self.intern_lines:
+            return config
+        parsed = get_cached_parsed(digest)
+        if parsed is not None:
+            return parsed.lines
+        return tuple(config.split("\n"))
+
+    def parsed(self, name: str, evict: bool = True) -> Optional[ParsedConfig]:
+        """Get a node's config parsed into sections, or None if it is not in the store.
+
+        Parsed configs are cached per process by content hash (see
+        parser.get_parsed), so a backup is not parsed again while it stays
+        cached.
+
+        Args:
+            name: Node name.
+            evict: Let the parsed config push others out of the cache; bulk scans pass False.
+        """
+        digest = self._nodes.get(name)
+        if digest is None:
+            return None
+        return get_parsed(digest, lambda: self.lines(name), evict=evict)
+
+    def clear(self):
+        """Drop all stored configs and pooled lines."""
+        self._nodes.clear()
+        self._configs.clear()
+        self._line_pool.clear()
+
+    def stats(self) -> dict:
+        """Return node, distinct config and distinct line counts."""
+        return {
+            "nodes": len(self._nodes),
+            "configs": len(self._configs),
+            "lines": len(self._line_pool),
+        }
@@ -10,6 +10,10 @@ urlpatterns = [
     path("search/", views.ConfigSearchView.as_view(), name="config_search"),
     path("diff/", views.ConfigDiffView.as_view(), name="config_diff"),
     path("audit/", views.ConfigAuditView.as_view(), name="config_audit"),
+    path("export/", views.ConfigExportView.as_view(), name="config_export"),
+    path("drift/", views.ConfigDriftView.as_view(), name="config_drift"),
+    path("backups/", views.BackupStatusListView.as_view(), name="backup_status_list"),
     path("device/<int:pk>/content/", views.DeviceOxidizedContentView.as_view(), name="device_content"),
+    path("hook/", views.OxidizedHookView.as_view(), name="hook"),
     path("widget/backup-status/", views.WidgetBackupStatusContentView.as_view(), name="widget_backup_status"),
 ]
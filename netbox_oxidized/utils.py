@@ -0,0 +1,126 @@
+"""Shared helpers for NetBox Oxidized plugin."""
+
+import bisect
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Optional
+
+
+def parse_backup_time(node: dict) -> Optional[datetime]:
+    """Get the last backup time of an Oxidized node.
+
+    Args:
+        node: Node entry from /nodes.json.
+
+    Returns:
+        Timezone-aware datetime, or None if the node has no parseable backup time.
+    """
+    last_end = node.get("last", {}).get("end") if isinstance(node.get("last"), dict) else None
+    backup_time = last_end or node.get("time")
+    if not backup_time:
+        return None
+
+    try:
+        # Oxidized returns times like "2026-03-09 10:18:59 UTC"
+        time_str = str(backup_time).replace(" UTC", "").replace("Z", "")
+        return datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (ValueError, TypeError):
+        return None
+
+
+# Oxidized node statuses counted as failed backups
+FAILED_STATUSES = ("no_connection", "timeout")
+BACKUP_BUCKETS = ("recent", "stale", "critical", "failed", "never")
+
+
+def build_age_index(nodes: list) -> dict:
+    """Index nodes by backup age for the backup status widget and drill-down list.
+
+    Built once per nodes.json refresh, so counting or paging a bucket is a
+    bisect and a slice instead of re-parsing every node's backup time.
+
+    Args:
+        nodes: Node entries from /nodes.json.
+
+    Returns:
+        Dict with "aged" (nodes with a backup time, oldest first), "failed"
+        (failed nodes, oldest first) and "never" (never backed up, by name).
+        Each entry is [timestamp or None, name, full_name, model, group, status].
+    """
+    aged = []
+    failed = []
+    never = []
+
+    for node in nodes:
+        status = node.get("status", "")
+        dt = parse_backup_time(node)
+        entry = [
+            dt.timestamp() if dt else None,
+            node.get("name", ""),
+            node.get("full_name", ""),
+            node.get("model", ""),
+            node.get("group", ""),
+            status,
+        ]
+        if status == "never":
+            never.append(entry)
+        elif status in FAILED_STATUSES:
+            failed.append(entry)
+        elif dt is None:
+            never.append(entry)
+        else:
+            aged.append(entry)
+
+    aged.sort(key=lambda e: (e[0], e[1]))
+    failed.sort(key=lambda e: (e[0] or 0, e[1]))
+    never.sort(key=lambda e: e[1])
+    return {"aged": aged, "failed": failed, "never": never}
+
+
+def get_bucket(index: dict, bucket: str, stale_hours: int, critical_hours: int, now: datetime) -> list:
+    """Get the age index entries in one backup status bucket, oldest first.
+
+    Args:
+        index: Age index from build_age_index().
+        bucket: One of BACKUP_BUCKETS.
+        stale_hours: Backups older than this are stale.
+        critical_hours: Backups older than this are critical.
+        now: Reference time for backup ages.
+    """
+    if bucket in ("failed", "never"):
+        return index[bucket]
+
+    aged = index["aged"]
+    now_ts = now.timestamp()
+    critical_end = bisect.bisect_left(aged, now_ts - critical_hours * 3600, key=itemgetter(0))
+    stale_end = max(bisect.bisect_left(aged, now_ts - stale_hours * 3600, key=itemgetter(0)), critical_end)
+
+    if bucket == "critical":
+        return aged[:critical_end]
+    if bucket == "stale":
+        return aged[critical_end:stale_end]
+    return aged[stale_end:]
+
+
+def update_age_index(index: dict, node: dict):
+    """Move one node to its new place in an age index, in place.
+
+    Args:
+        index: Age index from build_age_index().
+        node: The node's updated entry from /nodes.json.
+    """
+    name = node.get("name", "")
+    for entries in index.values():
+        for i, entry in enumerate(entries):
+            if entry[1] == name:
+                del entries[i]
+                break
+
+    for bucket, entries in build_age_index([node]).items():
+        for entry in entries:
+            if bucket == "aged":
+                bisect.insort(index[bucket], entry, key=lambda e: (e[0], e[1]))
+            elif bucket == "failed":
+                bisect.insort(index[bucket], entry, key=lambda e: (e[0] or 0, e[1]))
+            else:
+                bisect.insort(index[bucket], entry, key=itemgetter(1))
@@ -1,23 +1,61 @@
 """Views for NetBox Oxidized plugin."""
 
 import difflib
+import json
 import logging
+from datetime import datetime, timezone
+from operator import itemgetter
+from urllib.parse import urlencode
 
-from dcim.models import Device
+from core.choices import JobStatusChoices
+from core.models import Job
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
 from django.conf import settings
+from django.contrib.auth.decorators import login_not_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
-from django.http import HttpResponse, JsonResponse
-from django.shortcuts import render
+from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from extras.models import Tag
 from netbox.views import generic
+from utilities.paginator import get_paginate_count
 from utilities.views import ViewTab, register_model_view
 
-from .client import get_client
+from .client import SEARCH_SORTS, get_client
+from .export import EXPORT_FORMATS, get_export_filename, get_export_node_names, stream_archive
+from .hooks import check_token, handle_hook
+from .jobs import DRIFT_GROUP_FILTERS, DriftReportJob
+from .mapping import get_device_ids, get_node_name, get_tab_filter
+from .models import OxidizedNode
+from .utils import BACKUP_BUCKETS, get_bucket
 from .widgets import get_backup_status_context
 
 logger = logging.getLogger(__name__)
 
+# Section names suggested in the search and diff forms
+COMMON_SECTIONS = (
+    "interface",
+    "router bgp",
+    "router ospf",
+    "ip access-list",
+    "line vty",
+    "snmp-server community",
+    "logging host",
+    "ntp",
+    "aaa",
+    "crypto",
+    "vlan",
+)
+
+
+def get_device_url(pk: int) -> str:
+    """Get the URL of a device from its ID, without loading it."""
+    return reverse("dcim:device", kwargs={"pk": pk})
+
 
 class SuperuserRequiredMixin(UserPassesTestMixin):
     """Restrict access to superusers only."""
@@ -29,21 +67,21 @@ class SuperuserRequiredMixin(UserPassesTestMixin):
 def should_show_tab(obj):
     """Determine if Oxidized tab should be shown for this device.
 
-    Checks device role and manufacturer against configured filters.
+    Checks device role and manufacturer against configured filters, using
+    precomputed role and device type IDs so no related objects are loaded.
     Empty filter lists mean show for all devices.
     """
-    config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
-    device_roles = config.get("device_roles", [])
-    manufacturers = config.get("manufacturers", [])
+    role_ids, device_type_ids = get_tab_filter()
 
-    if device_roles and hasattr(obj, "role") and obj.role:
-        if obj.role.slug not in device_roles:
-            return False
+    if role_ids is not None and getattr(obj, "role_id", None) and obj.role_id not in role_ids:
+        return False
 
-    if manufacturers and hasattr(obj, "device_type") and obj.device_type:
-        manufacturer_slug = obj.device_type.manufacturer.slug
-        if manufacturer_slug not in manufacturers:
-            return False
+    if (
+        device_type_ids is not None
+        and getattr(obj, "device_type_id", None)
+        and obj.device_type_id not in device_type_ids
+    ):
+        return False
 
     return True
 
@@ -52,7 +90,9 @@ def should_show_tab(obj):
 class DeviceOxidizedView(generic.ObjectView):
     """Oxidized tab view for Device detail pages. Renders HTMX loading spinner."""
 
-    queryset = Device.objects.all()
+    queryset = Device.objects.select_related(
+        "site", "location", "rack", "role", "device_type__manufacturer", "tenant", "platform"
+    )
     template_name = "netbox_oxidized/device_tab.html"
     tab = ViewTab(
         label="Oxidized",
@@ -63,7 +103,7 @@ class DeviceOxidizedView(generic.ObjectView):
     )
 
     def get(self, request, pk):
-        device = Device.objects.get(pk=pk)
+        device = self.get_object(pk=pk)
         return render(
             request,
             self.template_name,
@@ -80,20 +120,23 @@ class DeviceOxidizedContentView(LoginRequiredMixin, PermissionRequiredMixin, Vie
     permission_required = "dcim.view_device"
 
     def get(self, request, pk):
-        device = Device.objects.get(pk=pk)
+        device = get_object_or_404(Device, pk=pk)
         config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
         external_url = config.get("oxidized_external_url", config.get("oxidized_url", "")).rstrip("/")
 
-        client = get_client()
+        client = get_client(request)
         node_info = {}
         config_data = {}
+        versions = []
         error = None
 
         if client:
             try:
-                node_info = client.get_node(device.name)
+                node_name = get_node_name(device)
+                node_info = client.get_node(node_name)
                 if not node_info.get("error"):
-                    config_data = client.get_node_config(device.name)
+                    config_data = client.get_node_config(node_info.get("name") or node_name)
+                    versions = client.get_node_versions(node_info.get("full_name") or node_name, limit=10)
                 else:
                     error = node_info.get("error")
             except Exception as e:
@@ -110,6 +153,7 @@ class DeviceOxidizedContentView(LoginRequiredMixin, PermissionRequiredMixin, Vie
                     "node_info": node_info,
                     "config_text": config_data.get("config", ""),
                     "config_error": config_data.get("error"),
+                    "versions": versions,
                     "error": error,
                     "external_url": external_url,
                     "cached": node_info.get("cached", False) or config_data.get("cached", False),
@@ -126,7 +170,7 @@ class SettingsView(SuperuserRequiredMixin, View):
 
     def get(self, request):
         config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
-        client = get_client()
+        client = get_client(request)
 
         return render(
             request,
@@ -134,6 +178,8 @@ class SettingsView(SuperuserRequiredMixin, View):
             {
                 "config": config,
                 "configured": client is not None,
+                "node_count": OxidizedNode.objects.count(),
+                "mapped_count": OxidizedNode.objects.filter(device__isnull=False).count(),
             },
         )
 
@@ -142,7 +188,7 @@ class TestConnectionView(SuperuserRequiredMixin, View):
     """Test connection to Oxidized API."""
 
     def post(self, request):
-        client = get_client()
+        client = get_client(request)
         if not client:
             return JsonResponse({"success": False, "error": "Plugin not configured"}, status=400)
 
@@ -160,26 +206,41 @@ class ConfigSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
 
     def get(self, request):
         query = request.GET.get("q", "").strip()
+        sort = request.GET.get("sort", "matches")
+        if sort not in SEARCH_SORTS:
+            sort = "matches"
+        cursor = request.GET.get("cursor", "")
+        section = request.GET.get("section", "").strip()
         results = []
-        device_map = {}
+        page = {}
         error = None
         config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
         external_url = config.get("oxidized_external_url", config.get("oxidized_url", "")).rstrip("/")
+        try:
+            line_limit = min(max(int(request.GET.get("lines", config.get("search_line_limit", 10))), 1), 100)
+        except ValueError:
+            line_limit = config.get("search_line_limit", 10)
 
         if query:
-            client = get_client()
+            client = get_client(request)
             if client:
                 try:
-                    results = client.search_configs(query)
-                    # Map to NetBox devices and add URLs
+                    page = client.search_configs(
+                        query,
+                        sort=sort,
+                        cursor=cursor,
+                        page_size=get_paginate_count(request),
+                        line_limit=line_limit,
+                        section=section,
+                    )
+                    results = page["results"]
+                    # Link the visible page to its mapped NetBox devices
                     if results:
-                        device_names = [r["name"] for r in results]
-                        devices = Device.objects.filter(name__in=device_names)
-                        device_map = {d.name: d for d in devices}
+                        device_ids = get_device_ids([r["name"] for r in results])
                         for r in results:
-                            device = device_map.get(r["name"])
-                            if device:
-                                r["device_url"] = device.get_absolute_url()
+                            r["more_count"] = r["match_count"] - len(r["matching_lines"])
+                            if r["name"] in device_ids:
+                                r["device_url"] = get_device_url(device_ids[r["name"]])
                 except Exception as e:
                     logger.error(f"Config search error: {e}")
                     error = str(e)
@@ -191,8 +252,18 @@ class ConfigSearchView(LoginRequiredMixin, PermissionRequiredMixin, View):
             self.template_name,
             {
                 "query": query,
+                "section": section,
+                "common_sections": COMMON_SECTIONS,
+                "sort": sort,
+                "sort_choices": (("matches", "Match count"), ("name", "Name"), ("age", "Backup age")),
+                "line_limit": line_limit,
                 "results": results,
-                "result_count": len(results),
+                "result_count": page.get("total", 0),
+                "total_matches": page.get("total_matches", 0),
+                "page_start": page.get("start", 0),
+                "page_end": page.get("start", 0) + len(results),
+                "next_cursor": page.get("next_cursor", ""),
+                "prev_cursor": page.get("prev_cursor", ""),
                 "error": error,
                 "external_url": external_url,
             },
@@ -206,7 +277,7 @@ class ConfigDiffView(LoginRequiredMixin, PermissionRequiredMixin, View):
     template_name = "netbox_oxidized/config_diff.html"
 
     def get(self, request):
-        client = get_client()
+        client = get_client(request)
         nodes = []
         error = None
 
@@ -224,6 +295,7 @@ class ConfigDiffView(LoginRequiredMixin, PermissionRequiredMixin, View):
 
         device_a = request.GET.get("device_a", "")
         device_b = request.GET.get("device_b", "")
+        section = request.GET.get("section", "").strip()
         diff_html = ""
         config_a = ""
         config_b = ""
@@ -236,9 +308,18 @@ class ConfigDiffView(LoginRequiredMixin, PermissionRequiredMixin, View):
                 config_b = config_b_data.get("config", "")
 
                 if config_a and config_b:
+                    # Configs parsed earlier (e.g. by a search) are not split into lines again
+                    if section:
+                        lines_a = client.store.parsed(device_a).section_lines(section)
+                        lines_b = client.store.parsed(device_b).section_lines(section)
+                        config_a = "\n".join(lines_a)
+                        config_b = "\n".join(lines_b)
+                    else:
+                        lines_a = client.store.lines(device_a)
+                        lines_b = client.store.lines(device_b)
                     diff = difflib.unified_diff(
-                        config_a.splitlines(),
-                        config_b.splitlines(),
+                        lines_a,
+                        lines_b,
                         fromfile=device_a,
                         tofile=device_b,
                         lineterm="",
@@ -252,8 +333,8 @@ class ConfigDiffView(LoginRequiredMixin, PermissionRequiredMixin, View):
                 logger.error(f"Config diff error: {e}")
                 error = str(e)
 
-        # Map nodes to NetBox devices for linking
         node_names = sorted(set(n.get("name", "") for n in nodes if n.get("name")))
+        device_ids = get_device_ids([device_a, device_b]) if device_a or device_b else {}
 
         return render(
             request,
@@ -262,6 +343,10 @@ class ConfigDiffView(LoginRequiredMixin, PermissionRequiredMixin, View):
                 "node_names": node_names,
                 "device_a": device_a,
                 "device_b": device_b,
+                "device_a_url": get_device_url(device_ids[device_a]) if device_a in device_ids else "",
+                "device_b_url": get_device_url(device_ids[device_b]) if device_b in device_ids else "",
+                "section": section,
+                "common_sections": COMMON_SECTIONS,
                 "diff_html": diff_html,
                 "config_a": config_a,
                 "config_b": config_b,
@@ -278,7 +363,7 @@ class ConfigAuditView(LoginRequiredMixin, PermissionRequiredMixin, View):
     template_name = "netbox_oxidized/config_audit.html"
 
     def get(self, request):
-        client = get_client()
+        client = get_client(request)
         nodes = []
         error = None
 
@@ -341,6 +426,7 @@ class ConfigAuditView(LoginRequiredMixin, PermissionRequiredMixin, View):
                 error = str(e)
 
         node_names = sorted(set(n.get("name", "") for n in nodes if n.get("name")))
+        device_ids = get_device_ids([device_name]) if device_name else {}
 
         return render(
             request,
@@ -348,6 +434,7 @@ class ConfigAuditView(LoginRequiredMixin, PermissionRequiredMixin, View):
             {
                 "node_names": node_names,
                 "device_name": device_name,
+                "device_url": get_device_url(device_ids[device_name]) if device_name in device_ids else "",
                 "audit_html": audit_html,
                 "error": error,
                 "external_url": external_url,
@@ -355,6 +442,305 @@ class ConfigAuditView(LoginRequiredMixin, PermissionRequiredMixin, View):
         )
 
 
+class ConfigDriftView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Fleet drift report: devices in a role or device type ranked by distance from a reference config."""
+
+    permission_required = "dcim.view_device"
+    template_name = "netbox_oxidized/config_drift.html"
+
+    def get_permission_required(self):
+        # Generating a report runs a fleet-wide background job
+        if self.request.method == "POST":
+            return ("dcim.view_device", "core.add_job")
+        return super().get_permission_required()
+
+    @staticmethod
+    def _get_matching_job(params):
+        """Get a pending or running drift report job for the same parameters, if any."""
+        return (
+            Job.objects.filter(
+                name=DriftReportJob.name,
+                status__in=(JobStatusChoices.STATUS_PENDING, JobStatusChoices.STATUS_RUNNING),
+                data__group_by=params["group_by"],
+                data__group_value=params["group_value"],
+                data__golden=params["golden"],
+                data__threshold=params["threshold"],
+            )
+            .order_by("-created")
+            .first()
+        )
+
+    @staticmethod
+    def _get_params(data):
+        group_by = data.get("group_by", "role")
+        if group_by not in DRIFT_GROUP_FILTERS:
+            group_by = "role"
+        try:
+            threshold = min(max(float(data.get("threshold", 0.1)), 0.0), 1.0)
+        except ValueError:
+            threshold = 0.1
+        return {
+            "group_by": group_by,
+            "group_value": data.get("group_value", ""),
+            "golden": data.get("golden", ""),
+            "threshold": threshold,
+        }
+
+    def get(self, request):
+        client = get_client(request)
+        nodes = []
+        error = None
+
+        if client:
+            try:
+                nodes = client._get_all_nodes()
+            except Exception as e:
+                logger.error(f"Failed to fetch nodes for drift report: {e}")
+                error = str(e)
+        else:
+            error = "Oxidized plugin not configured."
+
+        params = self._get_params(request.GET)
+        report = None
+        report_job = None
+
+        if params["group_value"]:
+            report_job = (
+                Job.objects.filter(
+                    name=DriftReportJob.name,
+                    status=JobStatusChoices.STATUS_COMPLETED,
+                    data__group_by=params["group_by"],
+                    data__group_value=params["group_value"],
+                    data__golden=params["golden"],
+                    data__threshold=params["threshold"],
+                )
+                .order_by("-completed")
+                .first()
+            )
+            if report_job:
+                report = report_job.data
+                error = error or report.get("error")
+
+        pending_jobs = Job.objects.filter(
+            name=DriftReportJob.name,
+            status__in=(JobStatusChoices.STATUS_PENDING, JobStatusChoices.STATUS_RUNNING),
+        ).order_by("-created")
+
+        node_names = sorted(set(n.get("name", "") for n in nodes if n.get("name")))
+        matching_job = self._get_matching_job(params) if params["group_value"] else None
+
+        return render(
+            request,
+            self.template_name,
+            {
+                **params,
+                "node_names": node_names,
+                "roles": DeviceRole.objects.order_by("name"),
+                "device_types": DeviceType.objects.select_related("manufacturer").order_by(
+                    "manufacturer__name", "model"
+                ),
+                "report": report,
+                "report_job": report_job,
+                "pending_jobs": pending_jobs,
+                "matching_job": matching_job,
+                "error": error,
+            },
+        )
+
+    def post(self, request):
+        params = self._get_params(request.POST)
+        if params["group_value"] and not self._get_matching_job(params):
+            job = DriftReportJob.enqueue(user=request.user, **params)
+            # Record the parameters until the job stores its report, so repeat requests can find it
+            Job.objects.filter(
+                pk=job.pk, status__in=(JobStatusChoices.STATUS_PENDING, JobStatusChoices.STATUS_RUNNING)
+            ).update(data=params)
+        return redirect(f"{reverse('plugins:netbox_oxidized:config_drift')}?{urlencode(params)}")
+
+
+class ConfigExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Download configs of a filtered set of devices as a streamed archive."""
+
+    permission_required = "dcim.view_device"
+    template_name = "netbox_oxidized/config_export.html"
+
+    def get(self, request):
+        params = {
+            "roles": request.GET.getlist("role"),
+            "sites": request.GET.getlist("site"),
+            "manufacturers": request.GET.getlist("manufacturer"),
+            "tags": request.GET.getlist("tag"),
+            "query": request.GET.get("q", "").strip(),
+            "section": request.GET.get("section", "").strip(),
+        }
+        fmt = request.GET.get("format", "tar.gz")
+        if fmt not in EXPORT_FORMATS:
+            fmt = "tar.gz"
+        client = get_client(request)
+        error = None
+
+        if request.GET.get("download") and client:
+            try:
+                names = get_export_node_names(client, **params)
+            except Exception as e:
+                logger.error(f"Config export error: {e}")
+                names = []
+                error = str(e)
+            if names:
+                response = StreamingHttpResponse(stream_archive(client, names, fmt), content_type=EXPORT_FORMATS[fmt])
+                response["Content-Disposition"] = f'attachment; filename="{get_export_filename(fmt)}"'
+                return response
+            error = error or "No Oxidized nodes match the selected filters."
+        elif not client:
+            error = "Oxidized plugin not configured."
+
+        return render(
+            request,
+            self.template_name,
+            {
+                **params,
+                "format": fmt,
+                "formats": EXPORT_FORMATS,
+                "role_choices": DeviceRole.objects.order_by("name"),
+                "site_choices": Site.objects.order_by("name"),
+                "manufacturer_choices": Manufacturer.objects.order_by("name"),
+                "tag_choices": Tag.objects.order_by("name"),
+                "common_sections": COMMON_SECTIONS,
+                "error": error,
+            },
+        )
+
+
+class BackupStatusListView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """List Oxidized nodes in one backup status bucket, with their NetBox devices."""
+
+    permission_required = "dcim.view_device"
+    template_name = "netbox_oxidized/backup_status_list.html"
+    sort_choices = (
+        ("age", "Oldest first"),
+        ("-age", "Newest first"),
+        ("name", "Name"),
+        ("-name", "Name (descending)"),
+    )
+
+    def get(self, request):
+        bucket = request.GET.get("status", "critical")
+        if bucket not in BACKUP_BUCKETS:
+            bucket = "critical"
+        sort = request.GET.get("sort", "age")
+        if sort not in dict(self.sort_choices):
+            sort = "age"
+        try:
+            stale_hours = max(int(request.GET.get("stale_hours", 24)), 1)
+            critical_hours = max(int(request.GET.get("critical_hours", 168)), 1)
+        except ValueError:
+            stale_hours, critical_hours = 24, 168
+
+        client = get_client(request)
+        error = None
+        entries = []
+        if client:
+            entries = get_bucket(
+                client.get_age_index(), bucket, stale_hours, critical_hours, datetime.now(timezone.utc)
+            )
+        else:
+            error = "Oxidized plugin not configured."
+
+        # Buckets are indexed oldest first, so age sorts are a slice of the index
+        if sort == "-age":
+            entries = entries[::-1]
+        elif sort in ("name", "-name"):
+            # Never-backed-up nodes are indexed by name; age buckets change with the time and
+            # thresholds, so they cannot be kept in name order ahead of time
+            if bucket != "never":
+                entries = sorted(entries, key=itemgetter(1))
+            if sort == "-name":
+                entries = entries[::-1]
+
+        paginator = Paginator(entries, get_paginate_count(request))
+        page = paginator.get_page(request.GET.get("page"))
+
+        # Map the visible page to NetBox devices in one query
+        names = [entry[1] for entry in page]
+        mapped = OxidizedNode.objects.filter(name__in=names, device__isnull=False).select_related("device__site")
+        device_map = {node.name: node.device for node in mapped}
+        rows = [
+            {
+                "name": name,
+                "full_name": full_name,
+                "model": model,
+                "group": group,
+                "status": status,
+                "backup_time": datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else None,
+                "device": device_map.get(name),
+            }
+            for timestamp, name, full_name, model, group, status in page
+        ]
+
+        config = settings.PLUGINS_CONFIG.get("netbox_oxidized", {})
+        external_url = config.get("oxidized_external_url", config.get("oxidized_url", "")).rstrip("/")
+        params = {"status": bucket, "sort": sort, "stale_hours": stale_hours, "critical_hours": critical_hours}
+        if request.GET.get("per_page"):
+            params["per_page"] = request.GET["per_page"]
+
+        return render(
+            request,
+            self.template_name,
+            {
+                "status": bucket,
+                "status_choices": (
+                    ("recent", f"< {stale_hours}h"),
+                    ("stale", f"> {stale_hours}h"),
+                    ("critical", f"> {critical_hours // 24}d" if critical_hours >= 24 else f"> {critical_hours}h"),
+                    ("failed", "Failed"),
+                    ("never", "Never"),
+                ),
+                "sort": sort,
+                "sort_choices": self.sort_choices,
+                "stale_hours": stale_hours,
+                "critical_hours": critical_hours,
+                "rows": rows,
+                "page": page,
+                "paginator": paginator,
+                "querystring": urlencode(params),
+                "error": error,
+                "external_url": external_url,
+            },
+        )
+
+
+class OxidizedHookView(View):
+    """Receive Oxidized HTTP hook events and refresh the cached data of the affected node.
+
+    Authenticated with the hook_token setting instead of a NetBox session;
+    disabled while hook_token is empty.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(login_not_required(super().as_view(**initkwargs)))
+
+    def post(self, request):
+        token = settings.PLUGINS_CONFIG.get("netbox_oxidized", {}).get("hook_token", "")
+        if not token:
+            return JsonResponse({"error": "Hook receiver disabled. Set hook_token in plugin settings."}, status=404)
+        if not check_token(request, token):
+            return JsonResponse({"error": "Invalid hook token"}, status=403)
+
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+
+        client = get_client(request)
+        if not client:
+            return JsonResponse({"error": "Plugin not configured"}, status=400)
+
+        return JsonResponse(handle_hook(client, payload))
+
+
 class WidgetBackupStatusContentView(LoginRequiredMixin, View):
     """HTMX endpoint that returns backup status widget content."""
 
@@ -365,6 +751,7 @@ class WidgetBackupStatusContentView(LoginRequiredMixin, View):
         context = get_backup_status_context(
             stale_hours=stale_hours,
             critical_hours=critical_hours,
+            request=request,
         )
 
         return HttpResponse(
@@ -0,0 +1,125 @@
+"""Cache warm-up: prefetch nodes.json and node configs from Oxidized."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+
+from .client import NODES_CACHE_KEY
+from .mapping import get_mapped_node_names
+
+logger = logging.getLogger(__name__)
+
+# Names warmed by the current run, so an interrupted run can resume
+PROGRESS_CACHE_KEY = "netbox_oxidized_warmup_progress"
+# Progress is reported and checkpointed every this many nodes
+PROGRESS_EVERY = 100
+
+
+class RateLimiter:
+    """Space out calls across threads to at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_warmup_node_names(client, roles=None, manufacturers=None) -> list[str]:
+    """Get Oxidized node names to warm, optionally limited to NetBox device roles and manufacturers.
+
+    Args:
+        client: OxidizedClient whose node list is used.
+        roles: Device role slugs; None uses the device_roles plugin setting, empty means all roles.
+        manufacturers: Manufacturer slugs; None uses the manufacturers plugin setting, empty means all.
+    """
+    if roles is None:
+        roles = client.config.get("device_roles", [])
+    if manufacturers is None:
+        manufacturers = client.config.get("manufacturers", [])
+
+    names = [node["name"] for node in client._get_all_nodes() if node.get("name")]
+    if not roles and not manufacturers:
+        return names
+
+    filters = {}
+    if roles:
+        filters["role__slug__in"] = roles
+    if manufacturers:
+        filters["device_type__manufacturer__slug__in"] = manufacturers
+    mapped = set(get_mapped_node_names(**filters))
+    return [name for name in names if name in mapped]
+
+
+def warm_cache(client, names: list[str], workers: int = 4, rate: float = 5.0, restart: bool = False, progress=None):
+    """Fetch configs from Oxidized into the cache with bounded concurrency and a rate cap.
+
+    Nodes warmed by an earlier, interrupted run are skipped unless restart is
+    set; the checkpoint expires with the cache entries it describes.
+
+    Args:
+        client: OxidizedClient used to fetch configs.
+        names: Node names to warm.
+        workers: Maximum concurrent requests to Oxidized.
+        rate: Maximum requests per second to Oxidized (0 = unlimited).
+        restart: Ignore the checkpoint of a previous run.
+        progress: Optional callable(done, total, failed) called every PROGRESS_EVERY nodes.
+
+    Returns:
+        Dict with total, skipped, fetched and failed counts.
+    """
+    if client.git:
+        # Configs are read from the local repository and never cached
+        return {"total": len(names), "skipped": len(names), "fetched": 0, "failed": 0}
+
+    warmed = set() if restart else set(cache.get(PROGRESS_CACHE_KEY) or ())
+    pending = [name for name in names if name not in warmed]
+    limiter = RateLimiter(rate)
+
+    def fetch(name):
+        limiter.wait()
+        return name, client.refresh_node_config(name)
+
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for name, ok in pool.map(fetch, pending):
+            done += 1
+            if ok:
+                warmed.add(name)
+            else:
+                failed += 1
+            if done % PROGRESS_EVERY == 0 or done == len(pending):
+                cache.set(PROGRESS_CACHE_KEY, list(warmed), client.cache_timeout)
+                if progress:
+                    progress(done, len(pending), failed)
+
+    # A complete run leaves nothing to resume
+    if not failed:
+        cache.delete(PROGRESS_CACHE_KEY)
+
+    return {
+        "total": len(names),
+        "skipped": len(names) - len(pending),
+        "fetched": done - failed,
+        "failed": failed,
+    }
+
+
+def refresh_node_list(client) -> int:
+    """Re-fetch nodes.json into the cache and return the node count."""
+    cache.delete(NODES_CACHE_KEY)
+    client._nodes = None
+    client._node_index = None
+    return len(client._get_all_nodes())
@@ -9,6 +9,8 @@ from django.utils.translation import gettext as _
 from extras.dashboard.utils import register_widget
 from extras.dashboard.widgets import DashboardWidget, WidgetConfigForm
 
+from .utils import BACKUP_BUCKETS, get_bucket
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,60 +65,24 @@ class OxidizedBackupStatusWidget(DashboardWidget):
         )
 
 
-def get_backup_status_context(stale_hours=24, critical_hours=168):
+def get_backup_status_context(stale_hours=24, critical_hours=168, request=None):
     """Build backup status context from Oxidized API data."""
     from .client import get_client
 
-    client = get_client()
+    client = get_client(request)
     if not client:
         return {"error": "Oxidized not configured. Set oxidized_url in plugin settings."}
 
-    nodes = client._get_all_nodes()
+    index = client.get_age_index()
+    total = len(index["aged"]) + len(index["failed"]) + len(index["never"])
 
-    if not nodes:
+    if not total:
         return {"error": "Failed to retrieve nodes from Oxidized."}
 
     now = datetime.now(timezone.utc)
-    recent = 0
-    stale = 0
-    critical = 0
-    failed = 0
-    never = 0
-
-    for node in nodes:
-        status = node.get("status", "")
-
-        if status == "never":
-            never += 1
-            continue
-
-        if status in ("no_connection", "timeout"):
-            failed += 1
-            continue
-
-        # Parse last backup time
-        last_end = node.get("last", {}).get("end") if isinstance(node.get("last"), dict) else None
-        backup_time = last_end or node.get("time")
-
-        if not backup_time:
-            never += 1
-            continue
-
-        try:
-            # Oxidized returns times like "2026-03-09 10:18:59 UTC"
-            time_str = str(backup_time).replace(" UTC", "").replace("Z", "")
-            dt = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-            dt = dt.replace(tzinfo=timezone.utc)
-            age_hours = (now - dt).total_seconds() / 3600
-
-            if age_hours > critical_hours:
-                critical += 1
-            elif age_hours > stale_hours:
-                stale += 1
-            else:
-                recent += 1
-        except (ValueError, TypeError):
-            never += 1
+    recent, stale, critical, failed, never = (
+        len(get_bucket(index, bucket, stale_hours, critical_hours, now)) for bucket in BACKUP_BUCKETS
+    )
 
     statuses = [
         {
@@ -161,6 +127,8 @@ def get_backup_status_context(stale_hours=24, critical_hours=168):
 
     return {
         "statuses": statuses,
-        "total": len(nodes),
+        "total": total,
+        "stale_hours": stale_hours,
+        "critical_hours": critical_hours,
         "oxidized_url": oxidized_url,
     }